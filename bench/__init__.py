@@ -0,0 +1,8 @@
+"""
+离线基准测试
+
+用轻量替身代替 AstrBot 事件与上下文，直接驱动各步骤与整条 Pipeline，
+全程不访问网络。在插件根目录下运行：
+
+    python -m bench.run
+"""
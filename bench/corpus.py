@@ -0,0 +1,118 @@
+"""
+合成语料：固定随机种子，保证多次运行结果可比
+"""
+
+from __future__ import annotations
+
+import random
+
+_HANZI = "的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要她出也得里后自以会家可下而过天去能对小多然于心学么之都好看起发当没成只如事把还用第样道想作种开美总从无情己面最女但现前些所同日手又行意动方期它头经长儿回位分爱老因很给名法间斯知世什两次使身者被高已亲其进此话常与活正感"
+_EMOJI = "😀😂🤣😊😍🥰😘😎🤔🙄😴😭😡👍👏🙏💪🔥✨🎉❤️💔⭐🌟🍀🐱🐶"
+_BRACKETS = ["[{}]", "（{}）", "({})", "【{}】", "“{}”", "《{}》", "&&{}&&"]
+_PUNCT = "，。？！…\n"
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(_HANZI) for _ in range(n))
+
+
+def short_replies(n: int = 200, seed: int = 1) -> list[str]:
+    """群聊短回复：5~40 字，带少量标点"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = [_words(rng, rng.randint(2, 10)) for _ in range(rng.randint(1, 4))]
+        out.append("".join(p + rng.choice(_PUNCT[:4]) for p in parts))
+    return out
+
+
+def llm_essays(n: int = 5, length: int = 10_000, seed: int = 2) -> list[str]:
+    """LLM 长文：约 10k 字，按句子和段落组织"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        buf: list[str] = []
+        size = 0
+        while size < length:
+            sentence = _words(rng, rng.randint(8, 40)) + rng.choice(_PUNCT)
+            if rng.random() < 0.05:
+                sentence = "## " + sentence + "\n"
+            buf.append(sentence)
+            size += len(sentence)
+        out.append("".join(buf)[:length])
+    return out
+
+
+def emoji_heavy(n: int = 200, seed: int = 3) -> list[str]:
+    """emoji 密集的短回复"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        buf = []
+        for _ in range(rng.randint(4, 12)):
+            buf.append(_words(rng, rng.randint(1, 5)))
+            buf.append("".join(rng.choice(_EMOJI) for _ in range(rng.randint(1, 3))))
+        out.append("".join(buf))
+    return out
+
+
+def bracket_heavy(n: int = 200, seed: int = 4) -> list[str]:
+    """括号 / 引号 / 情绪标签密集的短回复"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        buf = []
+        for _ in range(rng.randint(3, 8)):
+            buf.append(_words(rng, rng.randint(2, 8)))
+            buf.append(rng.choice(_BRACKETS).format(_words(rng, rng.randint(1, 6))))
+            buf.append(rng.choice(_PUNCT[:4]))
+        out.append("".join(buf))
+    return out
+
+
+def fake_at_replies(
+    names: list[str], n: int = 200, seed: int = 5
+) -> list[str]:
+    """句首带假艾特的回复"""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        head = rng.choice(
+            [
+                f"@{rng.choice(names)} ",
+                f"[at:{rng.choice(names)}]",
+                f"@{rng.randint(10000, 999999999)} ",
+                "",
+            ]
+        )
+        out.append(head + _words(rng, rng.randint(5, 30)) + "。")
+    return out
+
+
+def fake_members(n: int = 2000, seed: int = 7) -> list[dict]:
+    """OneBot get_group_member_list 形状的群成员列表"""
+    rng = random.Random(seed)
+    return [
+        {
+            "user_id": 40000 + i,
+            "nickname": _words(rng, rng.randint(2, 6)),
+            "card": _words(rng, rng.randint(2, 4)) if rng.random() < 0.5 else "",
+            "last_sent_time": rng.randint(0, 1_700_000_000),
+        }
+        for i in range(n)
+    ]
+
+
+def keyword_list(n: int = 10_000, seed: int = 6) -> list[str]:
+    """拦截词表：2~6 字的随机词，与语料同一字表，保证有真实命中"""
+    rng = random.Random(seed)
+    return list(dict.fromkeys(_words(rng, rng.randint(2, 6)) for _ in range(n)))
+
+
+CORPORA = {
+    "short": short_replies,
+    "essay": llm_essays,
+    "emoji": emoji_heavy,
+    "bracket": bracket_heavy,
+}
+"""语料名 -> 生成函数"""
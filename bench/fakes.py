@@ -0,0 +1,250 @@
+"""
+AstrBot 事件 / 上下文 / OneBot 客户端的轻量替身
+"""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from astrbot.core.message.components import BaseMessageComponent, Plain
+from astrbot.core.message.message_event_result import (
+    MessageEventResult,
+    ResultContentType,
+)
+from astrbot.core.platform.astr_message_event import AstrMessageEvent
+from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
+    AiocqhttpMessageEvent,
+)
+
+from core.config import ConfigNode, PluginConfig
+from core.model import OutContext, StateManager
+from core.outbox import Outbox
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_msg_ids = count(1)
+
+
+class FakeBot:
+    """OneBot 客户端替身：所有调用立即返回，并记录调用次数"""
+
+    def __init__(
+        self,
+        members: list[dict[str, Any]] | None = None,
+        member_error: Exception | None = None,
+    ):
+        self.calls: dict[str, int] = {}
+        self.members = members or []
+        self.member_error = member_error
+        """非空时 get_group_member_list 抛出该异常"""
+
+    def _hit(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def send(self, event: Any, message: Any) -> dict:
+        self._hit("send")
+        return {"message_id": next(_msg_ids)}
+
+    async def send_group_msg(self, group_id: int, message: Any) -> dict:
+        self._hit("send_group_msg")
+        return {"message_id": next(_msg_ids)}
+
+    async def send_private_msg(self, user_id: int, message: Any) -> dict:
+        self._hit("send_private_msg")
+        return {"message_id": next(_msg_ids)}
+
+    async def delete_msg(self, message_id: int) -> None:
+        self._hit("delete_msg")
+
+    async def get_login_info(self) -> dict:
+        self._hit("get_login_info")
+        return {"user_id": 10000, "nickname": "BenchBot"}
+
+    async def get_ai_record(self, character: str, group_id: int, text: str) -> str:
+        self._hit("get_ai_record")
+        return f"https://example.invalid/{character}/{abs(hash(text))}.amr"
+
+    async def get_group_member_list(self, group_id: int) -> list[dict[str, Any]]:
+        self._hit("get_group_member_list")
+        if self.member_error is not None:
+            raise self.member_error
+        return self.members
+
+
+class FakeContext:
+    """插件 Context 替身，只实现步骤用到的接口"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, session: Any, chain: Any) -> bool:
+        self.sent += 1
+        return True
+
+    def get_config(self) -> dict:
+        return {"admins_id": ["10001"]}
+
+
+class _FakeEventMixin:
+    """不调用父类 __init__，只补齐步骤读取的属性"""
+
+    def _setup(
+        self,
+        chain: list[BaseMessageComponent],
+        *,
+        platform: str,
+        gid: str,
+        uid: str,
+        bid: str,
+        is_llm: bool,
+        bot: FakeBot,
+    ) -> None:
+        self._platform = platform
+        self._gid = gid
+        self._uid = uid
+        self._bid = bid
+        self._call_llm = False
+        self.bot = bot
+        self.session = SimpleNamespace(session_id=gid, message_type=None)
+        self.message_obj = SimpleNamespace(
+            message_id=str(next(_msg_ids)),
+            timestamp=int(time.time()),
+            raw_message={},
+        )
+        result = MessageEventResult()
+        result.chain = chain
+        if is_llm:
+            result.set_result_content_type(ResultContentType.LLM_RESULT)
+        self._result = result
+
+    @property
+    def unified_msg_origin(self) -> str:
+        return f"{self._platform}:GroupMessage:{self._gid}"
+
+    def get_platform_name(self) -> str:
+        return self._platform
+
+    def get_group_id(self) -> str:
+        return self._gid
+
+    def get_sender_id(self) -> str:
+        return self._uid
+
+    def get_self_id(self) -> str:
+        return self._bid
+
+    def get_sender_name(self) -> str:
+        return f"用户{self._uid}"
+
+    def get_result(self) -> MessageEventResult:
+        return self._result
+
+    def set_result(self, result: MessageEventResult) -> None:
+        self._result = result
+
+    def plain_result(self, text: str) -> MessageEventResult:
+        return MessageEventResult().message(text)
+
+    def should_call_llm(self, call_llm: bool) -> None:
+        self._call_llm = call_llm
+
+    async def _parse_onebot_json(self, message_chain: Any) -> list[dict]:
+        return [
+            {"type": type(c).__name__.lower(), "data": {}} for c in message_chain.chain
+        ]
+
+
+class FakeEvent(_FakeEventMixin, AstrMessageEvent):
+    def __init__(self, chain: list[BaseMessageComponent], **kwargs: Any):
+        self._setup(chain, **kwargs)
+
+
+class FakeAiocqhttpEvent(_FakeEventMixin, AiocqhttpMessageEvent):
+    def __init__(self, chain: list[BaseMessageComponent], **kwargs: Any):
+        self._setup(chain, **kwargs)
+
+
+def make_ctx(
+    chain: list[BaseMessageComponent] | str,
+    *,
+    platform: str = "aiocqhttp",
+    gid: str = "123456",
+    uid: str = "20001",
+    bid: str = "10000",
+    is_llm: bool = True,
+    bot: FakeBot | None = None,
+) -> OutContext:
+    """按 main.py 的方式构造一条待发送消息的上下文"""
+    if isinstance(chain, str):
+        chain = [Plain(chain)]
+    event_cls = FakeAiocqhttpEvent if platform == "aiocqhttp" else FakeEvent
+    event = event_cls(
+        chain,
+        platform=platform,
+        gid=gid,
+        uid=uid,
+        bid=bid,
+        is_llm=is_llm,
+        bot=bot or FakeBot(),
+    )
+    return OutContext(
+        event=event,
+        chain=chain,
+        is_llm=is_llm,
+        plain="".join(c.text for c in chain if isinstance(c, Plain)),
+        gid=gid,
+        uid=uid,
+        bid=bid,
+        group=StateManager.get_group(gid),
+        timestamp=event.message_obj.timestamp,
+    )
+
+
+def schema_defaults() -> dict[str, Any]:
+    """从 _conf_schema.json 提取默认配置"""
+    schema = json.loads((ROOT / "_conf_schema.json").read_text(encoding="utf-8"))
+
+    def _walk(items: dict) -> dict:
+        out = {}
+        for key, meta in items.items():
+            if meta.get("type") == "object":
+                out[key] = _walk(meta.get("items", {}))
+            else:
+                out[key] = meta.get("default")
+        return out
+
+    return _walk(schema)
+
+
+class BenchConfig(PluginConfig):
+    """不依赖 AstrBot 运行时的插件配置"""
+
+    def __init__(
+        self,
+        overrides: dict[str, dict[str, Any]] | None = None,
+        context: FakeContext | None = None,
+    ):
+        data = schema_defaults()
+        # 基准测试不模拟打字和撤回等待
+        data["split"]["max_delay_cap"] = 0
+        data["recall"]["delay"] = 0
+        data["send"].update(group_rate=0, global_rate=0, max_inflight=0, max_retries=0)
+        data["summary"]["quotes_files"] = [str(ROOT / "default_quotes.json")]
+        data["t2i"]["pillowmd_style_dir"] = str(ROOT / "t2i_style")
+        data["tts"]["group_id"] = "100"
+        for section, values in (overrides or {}).items():
+            data.setdefault(section, {}).update(values)
+
+        ConfigNode.__init__(self, data)
+        self.context = context or FakeContext()
+        self.outbox = Outbox(self.send)
+        self._keyword_engine = None
+        self.version = 0
+        self.admins_id = list(self.context.get_config()["admins_id"])
+        self.data_dir = Path(tempfile.mkdtemp(prefix="outputpro_bench_"))
@@ -0,0 +1,106 @@
+"""
+计时与内存分配统计
+"""
+
+from __future__ import annotations
+
+import gc
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(slots=True)
+class BenchResult:
+    case: str
+    ops: int
+    seconds: float
+    peak_bytes: float
+    """单次操作的平均峰值分配字节数"""
+    net_bytes: float
+    """单次操作结束后平均仍驻留的字节数"""
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.ops / self.seconds if self.seconds else float("inf")
+
+    @property
+    def us_per_op(self) -> float:
+        return self.seconds / self.ops * 1e6 if self.ops else 0.0
+
+
+async def measure(
+    case: str,
+    op: Callable[[Any], Awaitable[Any] | Any],
+    make_arg: Callable[[int], Any],
+    iterations: int = 200,
+    alloc_samples: int = 50,
+    is_async: bool = True,
+) -> BenchResult:
+    """
+    先预构造全部参数（不计入耗时），再依次执行 op。
+    内存分配单独跑一轮 tracemalloc，避免其开销污染计时。
+    """
+    args = [make_arg(i) for i in range(iterations)]
+
+    # 预热
+    for _ in range(min(5, iterations)):
+        r = op(make_arg(-1))
+        if is_async:
+            await r  # type: ignore[misc]
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        if is_async:
+            for arg in args:
+                await op(arg)  # type: ignore[misc]
+        else:
+            for arg in args:
+                op(arg)
+        seconds = time.perf_counter() - start
+    finally:
+        gc.enable()
+
+    peak_total = 0
+    net_total = 0
+    samples = [make_arg(i) for i in range(min(alloc_samples, iterations))]
+    tracemalloc.start()
+    try:
+        for arg in samples:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            r = op(arg)
+            if is_async:
+                await r  # type: ignore[misc]
+            after, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+            net_total += after - before
+    finally:
+        tracemalloc.stop()
+
+    n = max(len(samples), 1)
+    return BenchResult(
+        case=case,
+        ops=iterations,
+        seconds=seconds,
+        peak_bytes=peak_total / n,
+        net_bytes=net_total / n,
+    )
+
+
+def render(results: list[BenchResult]) -> str:
+    width = max([len(r.case) for r in results] + [4])
+    lines = [
+        f"{'case':<{width}}  {'ops/s':>12}  {'us/op':>10}  "
+        f"{'peak KiB/op':>12}  {'net B/op':>10}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r.case:<{width}}  {r.ops_per_sec:>12.1f}  {r.us_per_op:>10.1f}  "
+            f"{r.peak_bytes / 1024:>12.2f}  {r.net_bytes:>10.0f}"
+        )
+    return "\n".join(lines)
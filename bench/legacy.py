@@ -0,0 +1,61 @@
+"""
+被替换前的实现，仅供基准测试对比
+"""
+
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+
+import emoji
+
+from core.config import CleanConfig
+
+
+def legacy_clean(cfg: CleanConfig, text: str) -> str:
+    """CleanStep 逐项 findall + sub 的旧实现"""
+    removed: dict[str, list[str]] = defaultdict(list)
+
+    if cfg.bracket:
+        matches = re.findall(r"\[.*?\]", text)
+        if matches:
+            removed["中括号内容"].extend(matches)
+            text = re.sub(r"\[.*?\]", "", text)
+
+    if cfg.parenthesis:
+        matches = re.findall(r"[（(].*?[）)]", text)
+        if matches:
+            removed["圆括号内容"].extend(matches)
+            text = re.sub(r"[（(].*?[）)]", "", text)
+
+    if cfg.emotion_tag:
+        matches = re.findall(r"&&.*?&&", text)
+        if matches:
+            removed["情绪标签"].extend(matches)
+            text = re.sub(r"&&.*?&&", "", text)
+
+    if cfg.emoji:
+        emojis = [c for c in text if c in emoji.EMOJI_DATA]
+        if emojis:
+            removed["Emoji"].extend(emojis)
+            text = emoji.replace_emoji(text, replace="")
+
+    for s in cfg.lead:
+        if text.startswith(s):
+            removed["前缀"].append(s)
+            text = text[len(s) :]
+            break
+
+    for s in cfg.tail:
+        if text.endswith(s):
+            removed["后缀"].append(s)
+            text = text[: -len(s)]
+            break
+
+    if cfg.punctuation:
+        matches = re.findall(cfg.punctuation, text)
+        if matches:
+            removed["标点字符"].extend(matches)
+            text = re.sub(cfg.punctuation, "", text)
+
+    return text
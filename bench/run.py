@@ -0,0 +1,277 @@
+"""
+逐步骤 / 整条 Pipeline 的离线基准测试
+
+    python -m bench.run
+    python -m bench.run --steps clean,replace --corpora short,emoji -n 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable
+
+from astrbot.core.message.components import Image, Plain
+
+from core.keywords import KeywordEngine
+from core.model import OutContext, StateManager
+from core.pipeline import Pipeline
+from core.step import AtStep, BaseStep, CleanStep, SplitStep
+
+from .corpus import CORPORA, fake_at_replies, fake_members, keyword_list
+from .fakes import BenchConfig, FakeBot, make_ctx
+from .harness import BenchResult, measure, render
+from .legacy import legacy_clean
+
+_NAMES = ["张三", "李四(小李)", "王五_Official", "赵六·七", "Alice Bob", "小明同学"]
+
+
+def _cycle(texts: list[str]) -> Callable[[int], str]:
+    return lambda i: texts[i % len(texts)]
+
+
+def _guarded(step: BaseStep):
+    """与 Pipeline 一致：前置检查通过后才调用 handle"""
+
+    async def op(ctx: OutContext):
+        if ctx.chain and step.accepts(ctx):
+            return await step.handle(ctx)
+
+    return op
+
+
+def _seed_names(gid: str) -> None:
+    group = StateManager.get_group(gid)
+    for i, name in enumerate(_NAMES):
+        group.remember_name(name, str(30000 + i))
+
+
+async def bench_steps(
+    config: BenchConfig,
+    steps: list[str],
+    corpora: list[str],
+    iterations: int,
+) -> list[BenchResult]:
+    results: list[BenchResult] = []
+    bot = FakeBot()
+    step_map = dict(Pipeline.STEP_REGISTRY)
+    _seed_names("123456")
+
+    for name in steps:
+        step: BaseStep = Pipeline._step_class(step_map[name])(config)
+        await step.initialize()
+        try:
+            for corpus in corpora:
+                pick = _cycle(CORPORA[corpus]())
+                results.append(
+                    await measure(
+                        f"{name}/{corpus}",
+                        _guarded(step),
+                        lambda i, pick=pick: make_ctx(pick(i), bot=bot),
+                        iterations,
+                    )
+                )
+
+            # 针对性用例
+            if isinstance(step, SplitStep):
+                for corpus in corpora:
+                    pick = _cycle(CORPORA[corpus]())
+                    results.append(
+                        await measure(
+                            f"split._split_chain/{corpus}",
+                            step._split_chain,
+                            lambda i, pick=pick: [Plain(pick(i))],
+                            iterations,
+                            is_async=False,
+                        )
+                    )
+            elif isinstance(step, CleanStep):
+                for corpus in corpora:
+                    pick = _cycle(CORPORA[corpus]())
+                    for label, op in (
+                        ("fused", lambda t: step.cleaner.clean(t, defaultdict(list))),
+                        ("legacy", lambda t: legacy_clean(step.cfg, t)),
+                    ):
+                        results.append(
+                            await measure(
+                                f"clean.{label}/{corpus}",
+                                op,
+                                pick,
+                                iterations,
+                                is_async=False,
+                            )
+                        )
+            elif isinstance(step, AtStep):
+                pick = _cycle(fake_at_replies(_NAMES))
+                results.append(
+                    await measure(
+                        "at._parse_fake_at/fake_at",
+                        step._parse_fake_at,
+                        lambda i: make_ctx(pick(i), bot=bot),
+                        iterations,
+                        is_async=False,
+                    )
+                )
+
+                # 从替身 OneBot 客户端批量加载成员目录后，按成员名片 / 昵称解析
+                members = fake_members()
+                member_bot = FakeBot(members=members)
+                group = StateManager.get_group("654321")
+                results.append(
+                    await measure(
+                        f"at._load_members/{len(members)}",
+                        lambda _: step._load_members(member_bot, group),
+                        lambda i: None,
+                        max(iterations // 50, 1),
+                        alloc_samples=1,
+                    )
+                )
+                names = [m["card"] or m["nickname"] for m in members]
+                pick = _cycle(fake_at_replies(names))
+                results.append(
+                    await measure(
+                        "at._parse_fake_at/directory",
+                        step._parse_fake_at,
+                        lambda i: make_ctx(pick(i), gid="654321", bot=member_bot),
+                        iterations,
+                        is_async=False,
+                    )
+                )
+            elif name == "summary":
+                results.append(
+                    await measure(
+                        "summary/image",
+                        _guarded(step),
+                        lambda i: make_ctx(
+                            [Image.fromURL("https://example.invalid/a.png")], bot=bot
+                        ),
+                        iterations,
+                    )
+                )
+        finally:
+            await step.terminate()
+
+    return results
+
+
+async def bench_pipeline(
+    config: BenchConfig, corpora: list[str], iterations: int
+) -> list[BenchResult]:
+    results: list[BenchResult] = []
+    bot = FakeBot()
+    pipeline = Pipeline(config)
+    await pipeline.initialize()
+    try:
+        for corpus in corpora:
+            pick = _cycle(CORPORA[corpus]())
+            for is_llm in (True, False):
+                results.append(
+                    await measure(
+                        f"pipeline/{corpus}/{'llm' if is_llm else 'other'}",
+                        pipeline.run,
+                        lambda i, pick=pick, is_llm=is_llm: make_ctx(
+                            pick(i), bot=bot, is_llm=is_llm
+                        ),
+                        iterations,
+                    )
+                )
+    finally:
+        await pipeline.terminate()
+    return results
+
+
+async def bench_keywords(
+    corpora: list[str], iterations: int, size: int
+) -> list[BenchResult]:
+    """
+    逐词 `word in text` 与 KeywordEngine 的对比：三组词表各 size 个词，
+    另测各 30 个词（接近默认配置，走逐词查找分支）
+    """
+    results: list[BenchResult] = []
+    for n in sorted({30, size}):
+        lists = {
+            tag: keyword_list(n, seed=seed)
+            for seed, tag in enumerate(("error", "block", "recall"), start=6)
+        }
+
+        def naive(text: str, lists=lists) -> dict[str, str]:
+            hits = {}
+            for tag, words in lists.items():
+                for word in words:
+                    if word in text:
+                        hits[tag] = word
+                        break
+            return hits
+
+        results.append(
+            await measure(
+                f"keywords.build/{n}",
+                lambda _, lists=lists: KeywordEngine(lists),
+                lambda i: None,
+                max(iterations // 50, 1),
+                alloc_samples=1,
+                is_async=False,
+            )
+        )
+        engine = KeywordEngine(lists)
+        for corpus in corpora:
+            pick = _cycle(CORPORA[corpus]())
+            for label, op in (("naive", naive), ("engine", engine.scan)):
+                results.append(
+                    await measure(
+                        f"keywords.{label}/{n}/{corpus}",
+                        op,
+                        pick,
+                        iterations,
+                        is_async=False,
+                    )
+                )
+    return results
+
+
+def _parse_list(value: str, choices: list[str]) -> list[str]:
+    items = [v.strip() for v in value.split(",") if v.strip()]
+    unknown = set(items) - set(choices)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知选项: {','.join(sorted(unknown))}")
+    return items
+
+
+async def main(argv: list[str] | None = None) -> None:
+    step_names = [name for name, _ in Pipeline.STEP_REGISTRY]
+    parser = argparse.ArgumentParser(description="OutputPro 离线基准测试")
+    parser.add_argument(
+        "--steps",
+        type=lambda v: _parse_list(v, step_names),
+        default=step_names,
+        help="逗号分隔的步骤名，默认全部",
+    )
+    parser.add_argument(
+        "--corpora",
+        type=lambda v: _parse_list(v, list(CORPORA)),
+        default=list(CORPORA),
+        help="逗号分隔的语料名，默认全部",
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    parser.add_argument("--no-pipeline", action="store_true", help="跳过整条管道")
+    parser.add_argument(
+        "--keywords",
+        type=int,
+        default=10_000,
+        help="关键词匹配对比的词表大小，设为 0 跳过",
+    )
+    args = parser.parse_args(argv)
+
+    config = BenchConfig()
+
+    results = await bench_steps(config, args.steps, args.corpora, args.iterations)
+    if not args.no_pipeline:
+        results += await bench_pipeline(config, args.corpora, args.iterations)
+    if args.keywords > 0:
+        results += await bench_keywords(args.corpora, args.iterations, args.keywords)
+    print(render(results))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
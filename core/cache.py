@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Generic, TypeVar
+
+from astrbot.api import logger
+
+V = TypeVar("V")
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    path: Path
+    size: int
+    """文件字节数"""
+    created: float
+    """写入时间（time.time，跨重启有效）"""
+    used: float = 0.0
+    """最近一次交出路径的时间（monotonic），用于淘汰后的保留期"""
+
+
+class FileCache:
+    """
+    内容寻址的文件缓存：文件名为键（十六进制摘要）+ 扩展名。
+
+    - 命中即复用已有文件，不重复生成
+    - 按 LRU 淘汰，总字节数不超过 budget；超过 ttl 的条目在访问或写入时淘汰
+    - 启动时扫描目录恢复索引，进程重启后仍可命中
+    - 索引只在事件循环内读写；被淘汰的文件先记下，由 purge() 在线程中删除
+    - get / put 交出的路径会随消息链稍后才发送（分段延迟、发送重试），
+      因此被淘汰的文件在最后一次交出后至少保留 PIN_SECONDS 才删除
+    """
+
+    _NAME_RE = re.compile(r"^([0-9a-f]{16,64})\.\w+$")
+
+    PIN_SECONDS = 600.0
+    """路径交出后至少保留多久（秒），覆盖消息发送的耗时"""
+
+    def __init__(self, root: Path, budget: int = 0, ttl: float = 0):
+        self.root = root
+        self.budget = budget
+        """字节预算，0 表示不限"""
+        self.ttl = ttl
+        """条目有效期（秒），0 表示不限"""
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._trash: dict[Path, float] = {}
+        """已淘汰、待删除的文件 -> 可删除的时间（monotonic）"""
+
+    def scan(self) -> None:
+        """按修改时间恢复目录中已有的缓存文件（阻塞 IO）"""
+        self._entries.clear()
+        self.bytes = 0
+        found: list[tuple[float, str, CacheEntry]] = []
+        for path in self.root.iterdir():
+            m = self._NAME_RE.match(path.name)
+            if not m or not path.is_file():
+                continue
+            st = path.stat()
+            found.append((st.st_mtime, m.group(1), CacheEntry(path, st.st_size, st.st_mtime)))
+        for _, key, entry in sorted(found, key=lambda x: x[0]):
+            self._entries[key] = entry
+            self.bytes += entry.size
+        self._shrink()
+        # 启动时没有在途的消息，淘汰的文件可立即删除
+        self._remove(list(self._trash))
+        self._trash.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return bool(self.ttl) and now - entry.created > self.ttl
+
+    def get(self, key: str) -> Path | None:
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry, time.time()):
+            self._evict(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        entry.used = time.monotonic()
+        self.hits += 1
+        return entry.path
+
+    def put(self, key: str, path: Path, size: int) -> Path:
+        """登记已以键命名写入 root 的文件（不做 IO），返回其路径"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+            if old.path != path:
+                self._discard(old)
+        # 同名文件已被重新写入，不能再按之前的淘汰记录删除
+        self._trash.pop(path, None)
+        entry = CacheEntry(path, size, time.time(), time.monotonic())
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self._shrink(keep=key)
+        return path
+
+    def _shrink(self, keep: str | None = None) -> None:
+        """淘汰过期条目，再按 LRU 压到预算以内（不淘汰 keep）"""
+        now = time.time()
+        if self.ttl:
+            for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                if key != keep:
+                    self._evict(key)
+        if self.budget:
+            for key in list(self._entries):
+                if self.bytes <= self.budget:
+                    break
+                if key != keep:
+                    self._evict(key)
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+        self.evictions += 1
+        self._discard(entry)
+
+    def _discard(self, entry: CacheEntry) -> None:
+        self._trash[entry.path] = entry.used + self.PIN_SECONDS
+
+    def _take_trash(self) -> list[Path]:
+        """取出已过保留期的待删除文件"""
+        now = time.monotonic()
+        due = [path for path, after in self._trash.items() if after <= now]
+        for path in due:
+            del self._trash[path]
+        return due
+
+    async def purge(self) -> None:
+        """在线程中删除已淘汰且已过保留期的文件"""
+        if self._trash and (due := self._take_trash()):
+            await asyncio.to_thread(self._remove, due)
+
+    @staticmethod
+    def _remove(paths: list[Path]) -> None:
+        for path in paths:
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"删除缓存文件失败 {path}: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class TTLCache(Generic[V]):
+    """
+    内存 LRU 缓存：条目数不超过 capacity（0 表示不限），
+    超过 ttl 秒的条目在访问时淘汰（0 表示不限）
+    """
+
+    def __init__(self, capacity: int, ttl: float = 0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[V, float]] = OrderedDict()
+        """键 -> (值, 写入时间 monotonic)"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> V | None:
+        item = self._entries.get(key)
+        if item is not None and self.ttl and time.monotonic() - item[1] > self.ttl:
+            del self._entries[key]
+            self.evictions += 1
+            item = None
+        if item is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key: str, value: V) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic())
+        self.resize(self.capacity)
+
+    def resize(self, capacity: int) -> None:
+        self.capacity = capacity
+        while capacity and len(self._entries) > capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -1,6 +1,8 @@
 # config.py
 from __future__ import annotations
 
+import copy
+import json
 import re
 from collections.abc import Mapping, MutableMapping
 from types import MappingProxyType, UnionType
@@ -11,6 +13,9 @@ from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.star.context import Context
 from astrbot.core.star.star_tools import StarTools
 
+from .keywords import KeywordEngine, trie_pattern
+from .outbox import Outbox
+
 
 class ConfigNode:
     """
@@ -132,17 +137,34 @@ class ErrorConfig(ConfigNode):
     keywords: list[str]
     custom_msg: str
     forward_umo: str
+    coalesce_window: int
+    """同类报错合并转发的窗口（秒），0 表示逐条转发"""
+    forward_timeout: int
+    """单个会话转发的超时（秒），0 表示不限"""
 
 
 class BlockConfig(ConfigNode):
     timeout: int
     block_reread: bool
+    reread_window: int
+    """复读检测比对最近多少条 Bot 回复"""
+    reread_similarity: float
+    """近似复读的 SimHash 相似度阈值（0~1），0 表示只拦截完全相同的回复"""
     block_words: list[str]
 
+    def __init__(self, data: MutableMapping[str, Any]):
+        super().__init__(data)
+        self._max_distance = round((1 - self.reread_similarity) * 64)
+        """近似复读允许的最大汉明距离"""
+
 
 class AtConfig(ConfigNode):
     at_str: bool
     at_prob: float
+    member_ttl: int
+    """群成员目录的刷新间隔（秒），0 表示不加载成员目录"""
+    member_limit: int
+    """每个群最多收录的成员数（按最近发言），0 表示不限"""
 
 
 class CleanConfig(ConfigNode):
@@ -160,6 +182,45 @@ class ReplaceConfig(ConfigNode):
     words: list[str]
     default_new_word: str
 
+    def __init__(self, data: MutableMapping[str, Any]):
+        super().__init__(data)
+
+        self.table: dict[str, str] = self._build_table()
+        """旧词 -> 新词（同一旧词以第一条规则为准）"""
+
+        self.pattern: re.Pattern[str] | None = (
+            re.compile(trie_pattern(list(self.table))) if self.table else None
+        )
+        """所有旧词合成的单个正则：一次从左到右扫描，同一位置取最长的旧词"""
+
+    @staticmethod
+    def _unescape(s: str) -> str:
+        """
+        简单转义处理：将 \\n, \\r, \\t, \\s 等转换为实际字符
+        """
+        return (
+            s.replace("\\n", "\n")  # 换行符
+            .replace("\\r", "\r")  # 回车符
+            .replace("\\t", "\t")  # 制表符
+            .replace("\\s", " ")  # 空格
+            .replace("\\\\", "\\")  # 反斜杠本身（放最后）
+        )
+
+    def _build_table(self) -> dict[str, str]:
+        table: dict[str, str] = {}
+        for word in self.words:
+            if not word.strip():
+                continue
+            raw_old, sep, raw_new = word.partition(" ")
+            old = self._unescape(raw_old)
+            if not old or old in table:
+                continue
+            if not sep:
+                table[old] = self.default_new_word * len(old)
+            else:
+                table[old] = self._unescape(raw_new)
+        return table
+
 
 class TTSConfig(ConfigNode):
     group_id: str
@@ -167,6 +228,18 @@ class TTSConfig(ConfigNode):
     threshold: int
     prob: float
     llm_decide: bool
+    cache_size: int
+    """内存缓存的语音条数，0 表示不缓存"""
+    cache_ttl: int
+    """缓存有效期（秒），0 表示不限"""
+    disk_cache_budget: int
+    """磁盘缓存上限（MB），大于 0 时改为把语音文件缓存到磁盘"""
+    warmup: list[str]
+    """预热语句：首条消息时在后台预先合成"""
+    max_concurrency: int
+    """同时进行的合成请求数上限，0 表示不限"""
+    timeout: float
+    """等待合成的最长时间（秒），超时改发文本，0 表示不限"""
 
 
 class T2IConfig(ConfigNode):
@@ -174,12 +247,35 @@ class T2IConfig(ConfigNode):
     pillowmd_style_dir: str
     auto_page: bool
     clean_cache: bool
+    cache_budget: int
+    """渲染结果缓存的磁盘预算（MB），0 表示不缓存"""
+    cache_ttl: int
+    """渲染结果缓存的有效期（秒），0 表示不限"""
+    render_mode: str
+    """渲染池类型：thread（线程池）/ process（进程池）"""
+    render_workers: int
+    """渲染 worker 数，即同时进行的渲染数上限"""
+    image_format: str
+    """输出格式：png / webp / jpeg"""
+    image_quality: int
+    """webp / jpeg 的质量（1~100）"""
+    max_width: int
+    """图片宽度上限（像素），0 表示不缩放"""
+    palette_colors: int
+    """png 调色板颜色数，0 表示不量化"""
+    page_chars: int
+    """分页发送时每页的字数，0 表示整篇渲染为一张图"""
 
 
 class ReplyConfig(ConfigNode):
     threshold: int
     include_at: bool
 
+    def __init__(self, data: MutableMapping[str, Any]):
+        super().__init__(data)
+        self._window = max(self.threshold * 2, self.threshold + 16)
+        """每个群记录的用户消息条数：留出余量，回复生成期间涌入的消息不会把原消息挤出窗口"""
+
 
 class ForwardConfig(ConfigNode):
     threshold: int
@@ -262,6 +358,41 @@ class SplitConfig(ConfigNode):
         return f"[{''.join(tokens)}]+"
 
 
+class MetricsConfig(ConfigNode):
+    export_interval: int
+    """统计数据导出间隔（秒），0 表示不导出"""
+
+
+class StateConfig(ConfigNode):
+    max_groups: int
+    """最多常驻内存的群数，0 表示不限"""
+    ttl: int
+    """群状态闲置多久（秒）后淘汰，0 表示不限"""
+    memory_budget: int
+    """群状态常驻内存预算（MB），0 表示不限"""
+    persist: bool
+    """是否把群状态快照到插件数据目录，重启后按群懒加载"""
+    snapshot_interval: int
+    """定时快照间隔（秒），0 表示仅在插件终止时快照"""
+
+
+class SendConfig(ConfigNode):
+    group_rate: float
+    """单个会话每秒最多发送的消息数，0 表示不限"""
+    group_burst: int
+    """单个会话允许的突发条数"""
+    global_rate: float
+    """全局每秒最多发送的消息数，0 表示不限"""
+    global_burst: int
+    """全局允许的突发条数"""
+    max_inflight: int
+    """同时在途的发送数上限，0 表示不限"""
+    max_retries: int
+    """发送失败后的最多重试次数"""
+    retry_backoff: float
+    """首次重试前的等待秒数，之后每次翻倍"""
+
+
 class PluginConfig(ConfigNode):
     pipeline: PipelineConfig
     summary: SummaryConfig
@@ -276,9 +407,90 @@ class PluginConfig(ConfigNode):
     forward: ForwardConfig
     recall: RecallConfig
     split: SplitConfig
+    metrics: MetricsConfig
+    state: StateConfig
+    send: SendConfig
 
     def __init__(self, cfg: AstrBotConfig, context: Context):
         super().__init__(cfg)
         self.context = context
+        self.outbox = Outbox(self.send)
+        """所有步骤共用的出站发送器"""
         self.admins_id: list[str] = context.get_config().get("admins_id", [])
         self.data_dir = StarTools.get_data_dir("astrbot_plugin_outputpro")
+        self.version = 0
+        """配置版本号，每次热重载生效后 +1"""
+        self._keyword_engine: KeywordEngine | None = None
+
+    _KEYWORD_SECTIONS = ("error", "block", "recall")
+    """关键词列表参与共享匹配自动机的配置段"""
+
+    @property
+    def keyword_engine(self) -> KeywordEngine:
+        """
+        报错 / 拦截 / 撤回关键词共用的匹配自动机（标签为配置段名），
+        首次使用时构建，相关配置段热重载后重建
+        """
+        engine = self._keyword_engine
+        if engine is None:
+            engine = self._keyword_engine = KeywordEngine(
+                {
+                    "error": self.error.keywords,
+                    "block": self.block.block_words,
+                    "recall": self.recall.keywords,
+                }
+            )
+        return engine
+
+    def read_saved(self) -> dict[str, Any]:
+        """
+        读取磁盘上已保存的配置（阻塞 IO）
+        """
+        path = getattr(self._data, "config_path", None)
+        if not path:
+            raise RuntimeError("当前配置没有对应的配置文件")
+        with open(path, encoding="utf-8-sig") as f:
+            return json.load(f)
+
+    def stage(self, data: Mapping[str, Any]) -> tuple[PluginConfig, set[str]]:
+        """
+        按新配置生成暂存副本，不修改当前配置；返回 (副本, 发生变化的配置段名)。
+        副本与当前配置共用 context / outbox 等运行时对象，只有变化的配置段是新的，
+        其子节点与关键词自动机在副本上按需重新构建
+        """
+        changed = {
+            key
+            for key in self._fields()
+            if key in data and self._data.get(key) != data[key]
+        }
+        staged = copy.copy(self)
+        object.__setattr__(
+            staged,
+            "_data",
+            {**self._data, **{key: copy.deepcopy(data[key]) for key in changed}},
+        )
+        object.__setattr__(
+            staged,
+            "_children",
+            {k: v for k, v in self._children.items() if k not in changed},
+        )
+        if changed.intersection(self._KEYWORD_SECTIONS):
+            staged._keyword_engine = None
+        return staged, changed
+
+    def commit(self, staged: PluginConfig, changed: set[str]) -> None:
+        """
+        使 stage() 的副本生效：变化的配置段、其子节点缓存与关键词自动机一并切换。
+        已按副本构建的子节点原样沿用，步骤持有的 cfg 即为生效后的配置
+        """
+        for key in changed:
+            self._data[key] = staged._data[key]
+            node = staged._children.get(key)
+            if node is None:
+                self._children.pop(key, None)
+            else:
+                self._children[key] = node
+        if changed:
+            self.version += 1
+        if changed.intersection(self._KEYWORD_SECTIONS):
+            self._keyword_engine = staged._keyword_engine
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from hashlib import blake2b
+
+
+def fingerprint(text: str) -> int:
+    """文本的 64 位指纹（跨进程稳定，可持久化）"""
+    return int.from_bytes(blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+@lru_cache(maxsize=32)
+def simhash(text: str, n: int = 3) -> int:
+    """
+    按字符 n-gram 计算 64 位 SimHash。
+    相似文本的汉明距离小；同一条消息的检查与记录会命中缓存
+    """
+    text = "".join(text.split())
+    if len(text) <= n:
+        grams = {text}
+    else:
+        grams = {text[i : i + n] for i in range(len(text) - n + 1)}
+
+    weights = [0] * 64
+    for gram in grams:
+        h = fingerprint(gram)
+        for i in range(64):
+            weights[i] += 1 if h >> i & 1 else -1
+
+    value = 0
+    for i, w in enumerate(weights):
+        if w > 0:
+            value |= 1 << i
+    return value
+
+
+class RecentFingerprints:
+    """
+    最近若干条文本的指纹窗口：
+
+    - 精确重复：指纹计数表，O(1) 判断
+    - 近似重复：逐条比较 SimHash 汉明距离（窗口很小）
+    - 只保存定长整数，不保存原文
+    """
+
+    __slots__ = ("_items", "_counts")
+
+    def __init__(self, window: int = 5):
+        self._items: deque[tuple[int, int | None]] = deque(maxlen=max(window, 1))
+        """(指纹, SimHash)，未计算 SimHash 时为 None"""
+        self._counts: dict[int, int] = {}
+        """指纹 -> 窗口内出现次数"""
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __contains__(self, fp: int) -> bool:
+        return fp in self._counts
+
+    def resize(self, window: int) -> None:
+        window = max(window, 1)
+        if window == self._items.maxlen:
+            return
+        items = list(self._items)[-window:]
+        self._items = deque(maxlen=window)
+        self._counts.clear()
+        for fp, sim in items:
+            self.add(fp, sim)
+
+    def add(self, fp: int, sim: int | None = None) -> None:
+        items = self._items
+        if len(items) == items.maxlen:
+            old, _ = items[0]
+            left = self._counts[old] - 1
+            if left:
+                self._counts[old] = left
+            else:
+                del self._counts[old]
+        items.append((fp, sim))
+        self._counts[fp] = self._counts.get(fp, 0) + 1
+
+    def near(self, sim: int, max_distance: int) -> bool:
+        """窗口内是否有 SimHash 汉明距离不超过 max_distance 的文本"""
+        return any(
+            other is not None and (sim ^ other).bit_count() <= max_distance
+            for _, other in self._items
+        )
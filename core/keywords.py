@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+
+def trie_pattern(words: list[str]) -> str:
+    """
+    把一组字面量合成前缀树形状的正则，如 ["ab", "ac", "a"] -> "a(?:b|c)?"。
+    每个分支的首字符互不相同，且可选部分是贪婪的，因此同一位置总是匹配最长的词
+    """
+    trie: dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def _build(node: dict[str, Any]) -> str | None:
+        branches: list[str] = []
+        leaves: list[str] = []
+        for ch, child in sorted((k, v) for k, v in node.items() if k):
+            rest = _build(child)
+            if rest is None:
+                leaves.append(re.escape(ch))
+            else:
+                branches.append(re.escape(ch) + rest)
+        if leaves:
+            branches.append(leaves[0] if len(leaves) == 1 else f"[{''.join(leaves)}]")
+        if not branches:
+            return None
+        if "" in node:
+            return f"(?:{'|'.join(branches)})?"
+        if len(branches) == 1:
+            return branches[0]
+        return f"(?:{'|'.join(branches)})"
+
+    return _build(trie) or ""
+
+
+class KeywordMatcher:
+    """
+    单组关键词的匹配器，匹配都在 C 层完成：
+
+    - 词不多于 LOOP_MAX 个时逐个 `word in text`，返回列表中最靠前的命中词
+      （短词表下子串查找最快，未命中的文本几乎零开销）
+    - 词更多时合成一个前缀树形状的正则，扫描一遍，返回文本中最靠前（同位置取最长）的命中词
+    """
+
+    LOOP_MAX = 128
+    """逐词查找的词表上限，超过则改用合成正则"""
+
+    __slots__ = ("words", "_pattern")
+
+    def __init__(self, words: Iterable[str]):
+        self.words = [word for word in words if word]
+        """关键词（原始顺序，忽略空串）"""
+        self._pattern: re.Pattern[str] | None = (
+            re.compile(trie_pattern(self.words))
+            if len(self.words) > self.LOOP_MAX
+            else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def find(self, text: str) -> str | None:
+        """返回命中的关键词，未命中返回 None"""
+        pattern = self._pattern
+        if pattern is not None:
+            m = pattern.search(text)
+            return m.group() if m else None
+        for word in self.words:
+            if word in text:
+                return word
+        return None
+
+
+class KeywordEngine:
+    """
+    多组带标签的关键词匹配：每个标签一个 KeywordMatcher，按需只扫描用到的标签
+    """
+
+    __slots__ = ("_matchers",)
+
+    def __init__(self, lists: Mapping[str, Iterable[str]]):
+        self._matchers = {tag: KeywordMatcher(words) for tag, words in lists.items()}
+        """标签 -> 匹配器"""
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self._matchers.values())
+
+    def find(self, tag: str, text: str) -> str | None:
+        """标签 tag 在 text 中的命中词；未知标签或未命中返回 None"""
+        matcher = self._matchers.get(tag)
+        return matcher.find(text) if matcher is not None else None
+
+    def scan(self, text: str) -> dict[str, str]:
+        """扫描全部标签，返回 {标签: 命中的关键词}，未命中的标签不出现"""
+        hits = {}
+        for tag, matcher in self._matchers.items():
+            word = matcher.find(text)
+            if word is not None:
+                hits[tag] = word
+        return hits
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import bisect
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .model import StepResult
+
+
+class LatencyHistogram:
+    """
+    对数分桶的耗时直方图（单位：秒）。
+
+    - 记录 O(1)，内存恒定
+    - 分位数按桶上界估算，相对误差不超过桶增长因子
+    """
+
+    _GROWTH = 1.25
+    _MIN = 1e-5
+    _BOUNDS: list[float] = []
+
+    __slots__ = ("counts", "total", "sum", "max")
+
+    def __init__(self):
+        if not LatencyHistogram._BOUNDS:
+            bound = self._MIN
+            while bound < 120:
+                LatencyHistogram._BOUNDS.append(bound)
+                bound *= self._GROWTH
+        self.counts = [0] * (len(self._BOUNDS) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self._BOUNDS, seconds)] += 1
+        self.total += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = q * self.total
+        acc = 0
+        for i, n in enumerate(self.counts):
+            acc += n
+            if acc >= rank:
+                if i < len(self._BOUNDS):
+                    return min(self._BOUNDS[i], self.max)
+                return self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+
+@dataclass(slots=True)
+class StepStats:
+    runs: int = 0
+    """实际执行次数"""
+    skips: int = 0
+    """被跳过次数"""
+    aborts: int = 0
+    """中断流水线次数"""
+    errors: int = 0
+    """失败次数（异常或 ok=False）"""
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    """单次执行耗时"""
+
+    def to_dict(self) -> dict[str, Any]:
+        h = self.latency
+        return {
+            "runs": self.runs,
+            "skips": self.skips,
+            "aborts": self.aborts,
+            "errors": self.errors,
+            "mean_ms": round(h.mean * 1000, 3),
+            "p50_ms": round(h.percentile(0.50) * 1000, 3),
+            "p95_ms": round(h.percentile(0.95) * 1000, 3),
+            "p99_ms": round(h.percentile(0.99) * 1000, 3),
+            "max_ms": round(h.max * 1000, 3),
+        }
+
+
+@dataclass(slots=True)
+class GroupTotals:
+    total: float = 0.0
+    """累计耗时（秒），含接管淘汰槽位时继承的 error"""
+    count: int = 0
+    """消息数"""
+    error: float = 0.0
+    """total 的最大高估量（Space-Saving 接管槽位时继承的耗时）"""
+    steps: dict[str, float] = field(default_factory=dict)
+    """步骤名 -> 该群在此步骤上的累计耗时（秒），只含接管槽位之后的部分"""
+
+    def slowest_steps(self, n: int = 3) -> list[tuple[str, float]]:
+        return sorted(self.steps.items(), key=lambda kv: -kv[1])[:n]
+
+
+class PipelineMetrics:
+    """
+    Pipeline 运行指标：按 (步骤名, 是否LLM) 统计次数与耗时，
+    另按群统计整条流水线及各步骤的累计耗时（只跟踪最耗时的若干个群，内存有界）
+    """
+
+    GROUP_SLOTS = 64
+    """按群统计的槽位数（Space-Saving：槽位满时新群接管累计耗时最少的槽位）"""
+    TOP_GROUPS = 10
+    """报表与导出中列出的群数"""
+
+    def __init__(self):
+        self._stats: dict[tuple[str, bool], StepStats] = {}
+        self._groups: dict[str, GroupTotals] = {}
+        self.started_at = time.time()
+
+    def _get(self, name: str, is_llm: bool) -> StepStats:
+        key = (getattr(name, "value", name), is_llm)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = StepStats()
+        return stats
+
+    def skip(self, name: str, is_llm: bool) -> None:
+        self._get(name, is_llm).skips += 1
+
+    def observe(
+        self,
+        name: str,
+        is_llm: bool,
+        elapsed: float,
+        result: StepResult | None,
+    ) -> None:
+        """记录一次执行，result 为 None 表示步骤抛出了异常"""
+        stats = self._get(name, is_llm)
+        stats.runs += 1
+        stats.latency.observe(elapsed)
+        if result is None or not result.ok:
+            stats.errors += 1
+        if result is not None and result.abort:
+            stats.aborts += 1
+
+    def observe_group(
+        self, gid: str, elapsed: float, steps: list[tuple[str, float]]
+    ) -> None:
+        """记录某群一条消息走完流水线的耗时，steps 为 [(步骤名, 耗时)]"""
+        groups = self._groups
+        totals = groups.get(gid)
+        if totals is None:
+            if len(groups) < self.GROUP_SLOTS:
+                totals = groups[gid] = GroupTotals()
+            else:
+                # 接管最少的槽位：继承其耗时作为高估上界，保证真正的热点群不会被挤掉
+                victim = min(groups, key=lambda k: groups[k].total)
+                floor = groups.pop(victim).total
+                totals = groups[gid] = GroupTotals(floor, 0, floor)
+        totals.total += elapsed
+        totals.count += 1
+        per_step = totals.steps
+        for name, seconds in steps:
+            per_step[name] = per_step.get(name, 0.0) + seconds
+
+    def top_groups(self, n: int | None = None) -> list[dict[str, Any]]:
+        """累计耗时最多的 n 个群（total_ms 可能高估，上界见 error_ms）"""
+        ranked = sorted(self._groups.items(), key=lambda kv: -kv[1].total)
+        return [
+            {
+                "gid": gid,
+                "messages": t.count,
+                "total_ms": round(t.total * 1000, 3),
+                "error_ms": round(t.error * 1000, 3),
+                "steps_ms": {
+                    name: round(seconds * 1000, 3)
+                    for name, seconds in t.slowest_steps(len(t.steps))
+                },
+            }
+            for gid, t in ranked[: n or self.TOP_GROUPS]
+        ]
+
+    def reset(self) -> None:
+        self._stats.clear()
+        self._groups.clear()
+        self.started_at = time.time()
+
+    def snapshot(self) -> dict[str, Any]:
+        steps: dict[str, dict[str, Any]] = {}
+        for (name, is_llm), stats in self._stats.items():
+            steps.setdefault(name, {})["llm" if is_llm else "other"] = stats.to_dict()
+        return {
+            "started_at": self.started_at,
+            "updated_at": time.time(),
+            "steps": steps,
+            "top_groups": self.top_groups(),
+        }
+
+    def render(self) -> str:
+        """渲染为便于阅读的文本报表"""
+        if not self._stats:
+            return "暂无统计数据"
+        lines = [f"统计时长：{int(time.time() - self.started_at)} 秒"]
+        for (name, is_llm), stats in sorted(self._stats.items()):
+            d = stats.to_dict()
+            lines.append(
+                f"{name}[{'llm' if is_llm else 'other'}] "
+                f"执行{d['runs']} 跳过{d['skips']} 中断{d['aborts']} 失败{d['errors']} | "
+                f"p50={d['p50_ms']}ms p95={d['p95_ms']}ms p99={d['p99_ms']}ms"
+            )
+        if self._groups:
+            lines.append("耗时最多的群：")
+            for g in self.top_groups(5):
+                slowest = "、".join(
+                    f"{name} {ms:.0f}ms" for name, ms in list(g["steps_ms"].items())[:3]
+                )
+                lines.append(
+                    f"  {g['gid']} {g['total_ms']:.0f}ms/{g['messages']}条"
+                    + (f"（{slowest}）" if slowest else "")
+                )
+        return "\n".join(lines)
+
+
+def write_json(path: Path, data: dict[str, Any]) -> None:
+    """写入 JSON 文件（先写临时文件再替换，避免读到半截内容）"""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
@@ -1,35 +1,379 @@
-from collections import OrderedDict, deque
-from dataclasses import dataclass
+import asyncio
+import logging
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any
-
-from pydantic import BaseModel, Field
+from typing import TYPE_CHECKING, Any
 
+from astrbot.api import logger
 from astrbot.core.message.components import BaseMessageComponent
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 
+from .fingerprint import RecentFingerprints
+from .nickname import MemberDirectory, NicknameTrie
+
+if TYPE_CHECKING:
+    from .config import StateConfig
+    from .keywords import KeywordEngine
+    from .store import StateStore
+
+
+class MessageLog:
+    """
+    用户消息的环形缓冲：每条消息分配递增序号，并维护 message_id -> 序号，
+    「某条消息之后又来了多少条」为 O(1)。容量随 reply.threshold 调整，内存有界
+    """
+
+    __slots__ = ("_ring", "_seqs", "seq")
+
+    def __init__(self, capacity: int = 10):
+        self._ring: list[str | None] = [None] * max(capacity, 1)
+        """序号 % 容量 -> message_id"""
+        self._seqs: dict[str, int] = {}
+        """窗口内的 message_id -> 序号"""
+        self.seq = 0
+        """下一条消息的序号"""
+
+    def __len__(self) -> int:
+        return len(self._seqs)
+
+    def __iter__(self):
+        """按到达顺序遍历窗口内的 message_id"""
+        return iter(sorted(self._seqs, key=self._seqs.__getitem__))
 
-class GroupState(BaseModel):
+    def __contains__(self, msg_id: str) -> bool:
+        return msg_id in self._seqs
+
+    def push(self, msg_id: str, capacity: int | None = None) -> None:
+        if capacity is not None:
+            self.resize(capacity)
+        ring, seqs = self._ring, self._seqs
+        slot = self.seq % len(ring)
+        old = ring[slot]
+        if old is not None and seqs.get(old) == self.seq - len(ring):
+            del seqs[old]
+        ring[slot] = msg_id
+        seqs[msg_id] = self.seq
+        self.seq += 1
+
+    def pushed_since(self, msg_id: str) -> int | None:
+        """msg_id 之后又到达的消息数；不在窗口内返回 None"""
+        seq = self._seqs.get(msg_id)
+        return None if seq is None else self.seq - seq - 1
+
+    def clear(self) -> None:
+        self._ring = [None] * len(self._ring)
+        self._seqs.clear()
+
+    def resize(self, capacity: int) -> None:
+        capacity = max(capacity, 1)
+        if capacity == len(self._ring):
+            return
+        # 沿用原序号，只保留新容量窗口内的消息，「之后到达条数」不变
+        items = self._seqs.items()
+        self._ring = [None] * capacity
+        self._seqs = {}
+        for msg_id, seq in items:
+            if seq >= self.seq - capacity:
+                self._seqs[msg_id] = seq
+                self._ring[seq % capacity] = msg_id
+
+
+@dataclass(slots=True)
+class GroupState:
     gid: str
     """群号"""
-    bot_msgs: deque = Field(default_factory=lambda: deque(maxlen=5))
-    """Bot消息缓存"""
-    msg_queue: deque[str] = Field(default_factory=lambda: deque(maxlen=10))
-    """用户消息缓存"""
-    name_to_qq: OrderedDict[str, str] = Field(default_factory=lambda: OrderedDict())
+    bot_msgs: RecentFingerprints = field(default_factory=RecentFingerprints)
+    """Bot 最近回复的指纹"""
+    msg_queue: MessageLog = field(default_factory=MessageLog)
+    """用户消息序号环"""
+    name_to_qq: OrderedDict[str, str] = field(default_factory=OrderedDict)
     """昵称 -> QQ"""
+    name_trie: NicknameTrie = field(default_factory=NicknameTrie)
+    """name_to_qq 的归一化昵称前缀树"""
+    members: MemberDirectory | None = None
+    """群成员目录（由 AtStep 按需批量加载，不持久化）"""
+    last_access: float = 0.0
+    """最近访问时间（monotonic）"""
+
+    def footprint(self) -> int:
+        """估算占用的内存字节数"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.gid)
+        # 指纹条目：元组 + 两个 64 位整数
+        size += sys.getsizeof(self.bot_msgs) + len(self.bot_msgs) * 120
+        # 环形槽位 + message_id -> 序号
+        size += sys.getsizeof(self.msg_queue) + len(self.msg_queue) * 150
+        size += sys.getsizeof(self.name_to_qq)
+        # 前缀树节点：一个小字典 + 键
+        size += len(self.name_trie) * 120
+        if self.members is not None:
+            size += self.members.footprint()
+        size += sum(
+            sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.name_to_qq.items()
+        )
+        return size
+
+    def to_dict(self) -> dict[str, Any]:
+        """导出可持久化的状态"""
+        return {
+            "bot_msgs": [list(item) for item in self.bot_msgs],
+            "msg_queue": list(self.msg_queue),
+            "name_to_qq": list(self.name_to_qq.items()),
+        }
+
+    @classmethod
+    def from_dict(
+        cls, gid: str, data: dict[str, Any], reread_window: int = 5
+    ) -> "GroupState":
+        """按快照恢复；reread_window 为复读检测窗口，快照中超出窗口的旧回复被丢弃"""
+        g = cls(gid, bot_msgs=RecentFingerprints(reread_window))
+        for fp, sim in data.get("bot_msgs", []):
+            g.bot_msgs.add(fp, sim)
+        msg_ids = data.get("msg_queue", [])
+        g.msg_queue.resize(len(msg_ids))
+        for msg_id in msg_ids:
+            g.msg_queue.push(msg_id)
+        for name, qq in data.get("name_to_qq", []):
+            g.remember_name(name, qq)
+        return g
+
+    def remember_name(self, name: str, qq: str, limit: int = 100) -> None:
+        """记录发言者昵称，超出 limit 时淘汰最久未发言的昵称"""
+        names = self.name_to_qq
+        old = names.get(name)
+        if old == qq:
+            names.move_to_end(name)
+            return
+        if old is None and len(names) >= limit:
+            evicted, _ = names.popitem(last=False)
+            self.name_trie.remove(evicted)
+        names[name] = qq
+        names.move_to_end(name)
+        self.name_trie.add(name, qq)
 
 
 class StateManager:
-    """内存状态管理"""
+    """
+    内存状态管理
+
+    按 LRU 顺序保存各群状态，超出群数上限、闲置超时或超出内存预算时淘汰最久未访问的群。
+    挂载 StateStore 后，首次访问某群时从快照懒加载，被访问过的群会在下次快照时写回
+    """
+
+    _groups: OrderedDict[str, GroupState] = OrderedDict()
+
+    max_groups: int = 0
+    """最多常驻的群数，0 表示不限"""
+    ttl: float = 0
+    """闲置多久（秒）后淘汰，0 表示不限"""
+    memory_budget: int = 0
+    """常驻内存预算（字节），0 表示不限"""
+    reread_window: int = 5
+    """各群的复读检测窗口（block.reread_window）"""
+
+    evictions: dict[str, int] = {"lru": 0, "ttl": 0, "budget": 0}
+    """按原因统计的淘汰次数"""
+    resident_bytes: int = 0
+    """最近一次巡检估算的常驻字节数"""
+
+    _SWEEP_EVERY = 256
+    """每访问多少次巡检一次 TTL 与内存预算"""
+    _ops: int = 0
+    _sizes: dict[str, int] = {}
+    """常驻群 -> 最近一次估算的字节数（resident_bytes 为其总和）"""
+    _touched: set[str] = set()
+    """自上次巡检以来被访问过、需要重新估算大小的群"""
+
+    _store: "StateStore | None" = None
+    """快照存储，None 表示不持久化"""
+    _dirty: dict[str, GroupState] = {}
+    """自上次快照以来被访问过的群（含已被淘汰、尚未写回的群）"""
+    _DIRTY_LIMIT = 512
+    """待写回的群数超过 max(max_groups, 该值) 时在后台提前快照，
+    避免未开定时快照（或间隔很长）时被淘汰的群在内存中无限累积"""
+    _flushing: asyncio.Task | None = None
+    """正在进行的提前快照"""
+
+    @classmethod
+    def configure(cls, cfg: "StateConfig", reread_window: int = 5) -> None:
+        """应用（新）配置；复读检测窗口变化时同步调整常驻与待写回的群"""
+        window = max(reread_window, 1)
+        if window != cls.reread_window:
+            cls.reread_window = window
+            for g in (*cls._groups.values(), *cls._dirty.values()):
+                g.bot_msgs.resize(window)
+        cls.max_groups = max(cfg.max_groups, 0)
+        cls.ttl = max(cfg.ttl, 0)
+        cls.memory_budget = max(cfg.memory_budget, 0) * 1024 * 1024
+        cls.sweep()
+
+    @classmethod
+    def attach_store(cls, store: "StateStore | None") -> None:
+        cls._store = store
+
+    @staticmethod
+    def _read(store: "StateStore", gid: str) -> dict[str, Any] | None:
+        """读取某群的快照（阻塞 IO），失败时返回 None"""
+        try:
+            return store.load(gid)
+        except Exception as e:
+            logger.warning(f"加载群 {gid} 的状态快照失败: {e}")
+            return None
 
-    _groups: dict[str, GroupState] = {}
+    @classmethod
+    def _restore(cls, gid: str, data: dict[str, Any] | None) -> GroupState:
+        if data:
+            try:
+                return GroupState.from_dict(gid, data, cls.reread_window)
+            except Exception as e:
+                logger.warning(f"恢复群 {gid} 的状态快照失败: {e}")
+        return GroupState(gid, bot_msgs=RecentFingerprints(cls.reread_window))
+
+    @classmethod
+    def _load(cls, gid: str) -> GroupState:
+        g = cls._dirty.get(gid)
+        if g is not None:
+            return g
+        store = cls._store
+        return cls._restore(gid, cls._read(store, gid) if store is not None else None)
+
+    @classmethod
+    def _admit(cls, gid: str, g: GroupState) -> GroupState:
+        """放入常驻表，超出群数上限时淘汰最久未访问的群"""
+        groups = cls._groups
+        groups[gid] = g
+        if cls.max_groups and len(groups) > cls.max_groups:
+            cls._evict(next(iter(groups)), "lru")
+        return g
+
+    @classmethod
+    async def load_group(cls, gid: str) -> GroupState:
+        """
+        同 get_group，但首次访问某群时在线程中读取快照，不在事件循环上查询 SQLite。
+        供事件入口使用；之后同一群的 get_group 直接命中内存
+        """
+        store = cls._store
+        if store is not None and gid not in cls._groups and gid not in cls._dirty:
+            data = await asyncio.to_thread(cls._read, store, gid)
+            # 读取期间同一群可能已被其他消息加载
+            if gid not in cls._groups:
+                cls._admit(gid, cls._dirty.get(gid) or cls._restore(gid, data))
+        return cls.get_group(gid)
 
     @classmethod
     def get_group(cls, gid: str) -> GroupState:
-        if gid not in cls._groups:
-            cls._groups[gid] = GroupState(gid=gid)
-        return cls._groups[gid]
+        """取群状态；未常驻时同步读取快照（事件入口请用 load_group）"""
+        groups = cls._groups
+        g = groups.get(gid)
+        if g is None:
+            g = cls._admit(gid, cls._load(gid))
+        else:
+            groups.move_to_end(gid)
+        g.last_access = time.monotonic()
+        cls._touched.add(gid)
+        if cls._store is not None:
+            cls._dirty[gid] = g
+            if len(cls._dirty) > max(cls.max_groups, cls._DIRTY_LIMIT):
+                cls._flush_soon()
+
+        cls._ops += 1
+        if cls._ops % cls._SWEEP_EVERY == 0:
+            cls.sweep()
+        return g
+
+    @classmethod
+    def touch(cls, gid: str) -> None:
+        """群状态在 get_group 之外变大（如后台加载完成）时调用，下次巡检重新估算"""
+        if gid in cls._groups:
+            cls._touched.add(gid)
+
+    @classmethod
+    def _evict(cls, gid: str, reason: str) -> None:
+        cls._groups.pop(gid, None)
+        cls._touched.discard(gid)
+        cls.resident_bytes -= cls._sizes.pop(gid, 0)
+        cls.evictions[reason] += 1
+
+    @classmethod
+    def _measure(cls) -> None:
+        """只重新估算上次巡检后被访问过的群，其余群沿用缓存的大小"""
+        groups, sizes = cls._groups, cls._sizes
+        for gid in cls._touched:
+            g = groups.get(gid)
+            if g is not None:
+                size = g.footprint()
+                cls.resident_bytes += size - sizes.get(gid, 0)
+                sizes[gid] = size
+        cls._touched.clear()
+
+    @classmethod
+    def sweep(cls) -> None:
+        """淘汰闲置超时的群，并把常驻内存压到预算以内"""
+        groups = cls._groups
+        if cls.ttl:
+            deadline = time.monotonic() - cls.ttl
+            while groups:
+                gid, g = next(iter(groups.items()))
+                if g.last_access >= deadline:
+                    break
+                cls._evict(gid, "ttl")
+
+        if cls.memory_budget:
+            cls._measure()
+            while len(groups) > 1 and cls.resident_bytes > cls.memory_budget:
+                cls._evict(next(iter(groups)), "budget")
+
+        while cls.max_groups and len(groups) > cls.max_groups:
+            cls._evict(next(iter(groups)), "lru")
+
+    @classmethod
+    def collect_dirty(cls) -> list[tuple[str, dict[str, Any], float]]:
+        """取出待写回的群状态（需在事件循环内调用）"""
+        now = time.time()
+        rows = [(gid, g.to_dict(), now) for gid, g in cls._dirty.items()]
+        cls._dirty = {}
+        return rows
+
+    @classmethod
+    def _flush_soon(cls) -> None:
+        if cls._flushing is not None and not cls._flushing.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        cls._flushing = loop.create_task(cls._flush())
+
+    @classmethod
+    async def _flush(cls) -> None:
+        try:
+            count = await cls.snapshot()
+            logger.debug(f"待写回的群过多，已提前快照 {count} 个群")
+        except Exception as e:
+            logger.warning(f"提前快照群状态失败: {e}")
+
+    @classmethod
+    async def snapshot(cls) -> int:
+        """把自上次快照以来访问过的群写入存储，返回写入的群数"""
+        store = cls._store
+        if store is None:
+            return 0
+        rows = cls.collect_dirty()
+        if rows:
+            await asyncio.to_thread(store.save_many, rows)
+        return len(rows)
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        cls._measure()
+        return {
+            "groups": len(cls._groups),
+            "resident_bytes": cls.resident_bytes,
+            "evictions": dict(cls.evictions),
+        }
 
 
 @dataclass
@@ -45,7 +389,19 @@ class OutContext:
     bid: str
     group: GroupState
     timestamp: int
+    keyword_hits: dict[str, str | None] | None = None
+    """plain 的关键词命中结果（标签 -> 命中词 / None），每个标签首次查询时扫描一次"""
+    prefetches: "dict[StepName, asyncio.Task] | None" = None
+    """步骤 -> 进入流水线时启动的预取任务"""
 
+    def keyword_hit(self, engine: "KeywordEngine", tag: str) -> str | None:
+        """plain 中标签 tag 的命中关键词，同一条消息每个标签只扫描一遍"""
+        hits = self.keyword_hits
+        if hits is None:
+            hits = self.keyword_hits = {}
+        if tag not in hits:
+            hits[tag] = engine.find(tag, self.plain)
+        return hits[tag]
 
 
 class StepName(str, Enum):
@@ -69,7 +425,17 @@ class StepResult:
     """步骤是否成功"""
     abort: bool = False
     """是否需要中断处理"""
-    msg: str | None = None
-    """附加消息"""
+    msg: "str | Callable[[], str] | None" = None
+    """附加消息；可传入无参 callable，仅在确实需要输出时才构建"""
     data: Any | None = None
     """携带的上下文信息"""
+
+    def message(self) -> str | None:
+        """取出附加消息（惰性消息在此时构建）"""
+        msg = self.msg
+        return msg() if callable(msg) else msg
+
+
+def debug_enabled() -> bool:
+    """是否输出调试日志；为 False 时步骤无需收集只用于日志的数据"""
+    return logger.isEnabledFor(logging.DEBUG)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any
+
+_BRACKET_RE = re.compile(r"[（(【\[].*?[)）】\]]")
+"""昵称中的括号备注，如 李四(小李)"""
+
+_ASCII_WORD = frozenset(
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+)
+"""英文昵称的词字符：命中后紧跟这些字符视为单词被截断"""
+
+
+def _cut_word(text: str, end: int) -> bool:
+    """昵称在 end 处结束是否截断了一个英文单词 / 数字，如 Alice 中的 Al"""
+    return (
+        0 < end < len(text)
+        and _norm_char(text[end - 1])[-1:] in _ASCII_WORD
+        and _norm_char(text[end])[:1] in _ASCII_WORD
+    )
+
+
+@lru_cache(maxsize=4096)
+def _norm_char(ch: str) -> str:
+    """单字符归一化：全角转半角（NFKC）并忽略大小写"""
+    return unicodedata.normalize("NFKC", ch).casefold()
+
+
+def normalize(text: str) -> str:
+    return "".join(_norm_char(ch) for ch in text)
+
+
+def aliases(name: str) -> set[str]:
+    """昵称的全部查找别名：归一化原名、去括号备注后的名字"""
+    out = {normalize(name.strip())}
+    bare = _BRACKET_RE.sub("", name).strip()
+    if bare:
+        out.add(normalize(bare))
+    out.discard("")
+    return out
+
+
+class NicknameTrie:
+    """
+    群昵称前缀树：对消息文本做一次遍历，取最长的已知昵称。
+
+    - 插入时预先计算别名（全半角 / 大小写归一化、去括号备注）
+    - 同一别名对应多个昵称时，以最近插入的为准
+    """
+
+    __slots__ = ("_root", "_size")
+
+    _END = ""
+    """终止标记键：{昵称: QQ}（按插入顺序，最后一个生效）"""
+
+    def __init__(self):
+        self._root: dict[str, Any] = {}
+        self._size = 0
+        """节点数"""
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, name: str, qq: str) -> None:
+        for alias in aliases(name):
+            node = self._root
+            for ch in alias:
+                nxt = node.get(ch)
+                if nxt is None:
+                    nxt = node[ch] = {}
+                    self._size += 1
+                node = nxt
+            owners: dict[str, str] = node.setdefault(self._END, {})
+            owners.pop(name, None)
+            owners[name] = qq
+
+    def remove(self, name: str) -> None:
+        for alias in aliases(name):
+            path: list[tuple[dict[str, Any], str]] = []
+            node = self._root
+            for ch in alias:
+                nxt = node.get(ch)
+                if nxt is None:
+                    break
+                path.append((node, ch))
+                node = nxt
+            else:
+                owners = node.get(self._END)
+                if not owners or owners.pop(name, None) is None:
+                    continue
+                if not owners:
+                    del node[self._END]
+                # 自下而上剪掉空节点
+                for parent, ch in reversed(path):
+                    if parent[ch]:
+                        break
+                    del parent[ch]
+                    self._size -= 1
+
+    def match(self, text: str, start: int = 0) -> tuple[str, str, int] | None:
+        """
+        从 text[start] 起匹配最长的已知昵称，
+        返回 (QQ, 昵称, 匹配结束位置)，无匹配返回 None。
+        英文 / 数字结尾的昵称须在词边界处结束（Al 不匹配 Alice）
+        """
+        node = self._root
+        best = None
+        for i in range(start, len(text)):
+            for ch in _norm_char(text[i]):
+                node = node.get(ch)
+                if node is None:
+                    return best
+            owners = node.get(self._END)
+            if owners and not _cut_word(text, i + 1):
+                name = next(reversed(owners))
+                best = (owners[name], name, i + 1)
+        return best
+
+
+class MemberDirectory:
+    """
+    群成员目录：由 OneBot get_group_member_list 批量构建（群名片 + 昵称），
+    供 AtStep 解析假 @。超过 limit 人的大群只收录最近发言的 limit 人
+    """
+
+    __slots__ = ("trie", "by_name", "loaded_at", "total")
+
+    def __init__(self, members: list[dict[str, Any]], limit: int, loaded_at: float):
+        self.trie = NicknameTrie()
+        """名片 / 昵称前缀树"""
+        self.by_name: dict[str, str] = {}
+        """归一化名片 / 昵称 -> QQ"""
+        self.loaded_at = loaded_at
+        """加载时间（monotonic）"""
+        self.total = len(members)
+        """群成员总数（含未收录的）"""
+
+        # 按最近发言升序插入：重名时最活跃的成员生效，群名片优先于昵称
+        members = sorted(members, key=lambda m: m.get("last_sent_time") or 0)
+        if limit > 0:
+            members = members[-limit:]
+        for key in ("nickname", "card"):
+            for member in members:
+                name = (member.get(key) or "").strip()
+                if not name:
+                    continue
+                qq = str(member.get("user_id", ""))
+                self.by_name[normalize(name)] = qq
+                self.trie.add(name, qq)
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def get(self, name: str) -> str | None:
+        return self.by_name.get(normalize(name.strip()))
+
+    def footprint(self) -> int:
+        """粗略估算占用的内存字节数"""
+        return len(self.by_name) * 160 + len(self.trie) * 120
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from astrbot.api import logger
+
+from .metrics import LatencyHistogram
+
+if TYPE_CHECKING:
+    from astrbot.core.message.message_event_result import MessageChain
+    from astrbot.core.platform.message_session import MessageSession
+    from astrbot.core.star.context import Context
+
+    from .config import SendConfig
+
+T = TypeVar("T")
+
+_TRANSIENT_ERRORS = frozenset(
+    {"ApiNotAvailable", "RetryAfter", "ClientConnectorError", "ConnectError"}
+)
+"""确定请求未送达的异常类名：OneBot 未连接、Telegram 限流、HTTP 连接失败"""
+_RATE_LIMIT_CODES = frozenset({429, 99991400})
+"""限流返回码：HTTP 429、飞书请求频率超限"""
+
+
+def _code(e: BaseException) -> Any:
+    for attr in ("status_code", "status", "retcode", "code"):
+        try:
+            code = getattr(e, attr, None)
+        except Exception:
+            continue
+        if code is not None:
+            return code
+    return None
+
+
+def is_transient(e: BaseException) -> bool:
+    """
+    是否为可安全重试的暂时性错误：连接被拒、平台未连接、被限流等确定消息尚未发出的失败。
+    超时（可能已经送达）与其他错误不重试，避免重复发送
+    """
+    chain: list[BaseException] = []
+    exc: BaseException | None = e
+    while exc is not None and len(chain) < 8:
+        chain.append(exc)
+        exc = exc.__cause__ or exc.__context__
+    if any(isinstance(x, (TimeoutError, asyncio.TimeoutError)) for x in chain):
+        return False
+    return any(
+        isinstance(x, ConnectionRefusedError)
+        or type(x).__name__ in _TRANSIENT_ERRORS
+        or _code(x) in _RATE_LIMIT_CODES
+        for x in chain
+    )
+
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多攒 burst 个。
+    acquire 按调用顺序排队（asyncio.Lock 先到先得），令牌不足时睡到够为止
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated", "_lock")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    @property
+    def idle(self) -> bool:
+        """令牌已攒满且无人排队，可以丢弃"""
+        self._refill()
+        return self.tokens >= self.burst and not self._lock.locked()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class Outbox:
+    """
+    统一出站发送：所有步骤的主动发送都经由这里。
+
+    - 限流：按会话与全局两级令牌桶，同一会话内按调用顺序放行
+    - 并发：同时在途的发送数不超过 max_inflight
+    - 重试：仅对确定未发出的暂时性错误（见 is_transient）按指数退避重试，
+      超时与其他错误直接抛出，重试次数用尽后抛出最后一次异常
+    - 统计：排队深度、发送耗时、重试与失败次数
+    """
+
+    _PRUNE_AT = 1024
+    """会话令牌桶超过该数量时清理闲置的桶"""
+
+    def __init__(self, cfg: SendConfig):
+        self._buckets: dict[str, TokenBucket] = {}
+        """会话 -> 令牌桶"""
+        self.configure(cfg)
+
+        self.waiting = 0
+        """当前排队等待令牌或并发名额的发送数"""
+        self.peak_waiting = 0
+        """排队深度峰值"""
+        self.inflight = 0
+        """当前在途发送数"""
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.wait = LatencyHistogram()
+        """排队耗时（限流 + 并发名额）"""
+        self.latency = LatencyHistogram()
+        """单次发送调用耗时"""
+
+    def configure(self, cfg: SendConfig) -> None:
+        """应用（新）配置；已有的会话令牌桶丢弃后按新速率重建"""
+        self.cfg = cfg
+        self._global = TokenBucket(cfg.global_rate, cfg.global_burst)
+        self._buckets = {}
+        self._slots = asyncio.Semaphore(cfg.max_inflight) if cfg.max_inflight > 0 else None
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._PRUNE_AT:
+                self._buckets = {k: b for k, b in self._buckets.items() if not b.idle}
+            bucket = self._buckets[key] = TokenBucket(
+                self.cfg.group_rate, self.cfg.group_burst
+            )
+        return bucket
+
+    async def _call(self, send: Callable[[], Awaitable[T]]) -> T:
+        start = time.perf_counter()
+        self.inflight += 1
+        try:
+            return await send()
+        finally:
+            self.inflight -= 1
+            self.latency.observe(time.perf_counter() - start)
+
+    async def send(self, key: str, send: Callable[[], Awaitable[T]]) -> T:
+        """
+        限流后执行 send()（暂时性错误按退避重试），返回其结果。
+        key 为限流会话（群号 / unified_msg_origin 等）；
+        send 每次重试都会被重新调用，须返回新的协程
+        """
+        cfg = self.cfg
+        attempt = 0
+        while True:
+            self.waiting += 1
+            if self.waiting > self.peak_waiting:
+                self.peak_waiting = self.waiting
+            start = time.perf_counter()
+            try:
+                await self._bucket(key).acquire()
+                await self._global.acquire()
+                slots = self._slots
+                if slots is not None:
+                    await slots.acquire()
+            finally:
+                self.waiting -= 1
+            self.wait.observe(time.perf_counter() - start)
+
+            try:
+                result = await self._call(send)
+                self.sent += 1
+                return result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= cfg.max_retries or not is_transient(e):
+                    self.failed += 1
+                    raise
+                attempt += 1
+                self.retries += 1
+                delay = cfg.retry_backoff * (2 ** (attempt - 1))
+                delay *= random.uniform(0.8, 1.2)
+                logger.debug(
+                    f"[Outbox] 发送到 {key} 失败({e})，{delay:.2f} 秒后第 {attempt} 次重试"
+                )
+            finally:
+                if slots is not None:
+                    slots.release()
+            await asyncio.sleep(delay)
+
+    async def send_message(
+        self, context: Context, session: str | MessageSession, chain: MessageChain
+    ) -> None:
+        """
+        经由 context.send_message 主动发送到 session，按会话来源（unified_msg_origin）限流。
+        未找到会话对应的平台（返回 False）直接视为发送失败，不重试
+        """
+        umo = str(session)
+
+        async def call() -> None:
+            if not await context.send_message(session, chain):
+                raise RuntimeError(f"未找到会话 {umo} 对应的平台")
+
+        await self.send(umo, call)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "inflight": self.inflight,
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+            "wait_p95_ms": round(self.wait.percentile(0.95) * 1000, 3),
+            "send_p50_ms": round(self.latency.percentile(0.50) * 1000, 3),
+            "send_p95_ms": round(self.latency.percentile(0.95) * 1000, 3),
+            "send_max_ms": round(self.latency.max * 1000, 3),
+        }
+
+    def render(self) -> str:
+        s = self.stats()
+        return (
+            f"出站发送：成功{s['sent']} 重试{s['retries']} 失败{s['failed']} | "
+            f"排队{s['waiting']}(峰值{s['peak_waiting']}) 在途{s['inflight']} | "
+            f"排队p95={s['wait_p95_ms']}ms 发送p50={s['send_p50_ms']}ms "
+            f"p95={s['send_p95_ms']}ms"
+        )
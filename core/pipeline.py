@@ -1,24 +1,21 @@
 from __future__ import annotations
 
+import asyncio
+import importlib
+import time
+from collections.abc import Mapping
+from typing import Any
+
 from astrbot.api import logger
 
 from .config import PluginConfig
-from .model import OutContext
-from .step import (
-    AtStep,
-    BaseStep,
-    BlockStep,
-    CleanStep,
-    ErrorStep,
-    ForwardStep,
-    RecallStep,
-    ReplaceStep,
-    ReplyStep,
-    SplitStep,
-    SummaryStep,
-    T2IStep,
-    TTSStep,
-)
+from .metrics import PipelineMetrics, write_json
+from .model import OutContext, StateManager, debug_enabled
+from .store import StateStore
+from .step.base import BaseStep
+
+_Plan = tuple[tuple[BaseStep, ...], tuple[str, ...], tuple[BaseStep, ...]]
+"""执行计划：(待执行步骤, 被跳过的步骤名, 实现了预取的步骤)"""
 
 
 class Pipeline:
@@ -30,79 +27,409 @@ class Pipeline:
     - 对外唯一接口：run
     """
 
-    # 默认顺序
-    STEP_REGISTRY: list[tuple[str, type[BaseStep]]] = [
-        ("summary", SummaryStep),
-        ("error", ErrorStep),
-        ("block", BlockStep),
-        ("at", AtStep),
-        ("clean", CleanStep),
-        ("replace", ReplaceStep),
-        ("tts", TTSStep),
-        ("t2i", T2IStep),
-        ("reply", ReplyStep),
-        ("forward", ForwardStep),
-        ("recall", RecallStep),
-        ("split", SplitStep),
+    # 默认顺序；值为 core.step 下的 "模块.类名"，只有启用的步骤才会被导入
+    STEP_REGISTRY: list[tuple[str, str]] = [
+        ("summary", "summary.SummaryStep"),
+        ("error", "error.ErrorStep"),
+        ("block", "block.BlockStep"),
+        ("at", "at.AtStep"),
+        ("clean", "clean.CleanStep"),
+        ("replace", "replace.ReplaceStep"),
+        ("tts", "tts.TTSStep"),
+        ("t2i", "t2i.T2IStep"),
+        ("reply", "reply.ReplyStep"),
+        ("forward", "forward.ForwardStep"),
+        ("recall", "recall.RecallStep"),
+        ("split", "split.SplitStep"),
     ]
 
     def __init__(self, config: PluginConfig):
         self.plugin_config = config
         self.cfg = config.pipeline
         self._steps: list[BaseStep] = []
+        self._plans: dict[tuple[bool, str], _Plan] = {}
+        """(is_llm, 平台名) -> 执行计划"""
+        self.metrics = PipelineMetrics()
+        self._export_task: asyncio.Task | None = None
+        self._snapshot_task: asyncio.Task | None = None
+        self._reload_lock = asyncio.Lock()
+        self._build_ms: dict[str, float] = {}
+        """步骤名 -> 最近一次导入 + 构建耗时（毫秒），用于启动耗时日志"""
 
-        self._build_steps()
+        StateManager.configure(config.state, config.block.reread_window)
+        self._steps = self._build_steps()
 
-    def _build_steps(self) -> None:
+    def _build_steps(
+        self,
+        reuse: Mapping[str, BaseStep] | None = None,
+        config: PluginConfig | None = None,
+    ) -> list[BaseStep]:
         """
-        根据配置构建步骤实例（默认顺序或自定义顺序）
+        根据配置构建步骤实例（默认顺序或自定义顺序）。
+        reuse 中的实例直接复用，不重新构建（热重载时配置未变化的步骤）；
+        config 为热重载的暂存配置，默认使用当前配置
         """
-        if self.cfg.lock_order:
-            for name, cls in self.STEP_REGISTRY:
-                if name in self.cfg._steps:
-                    step = cls(self.plugin_config)
-                    self._steps.append(step)
+        reuse = reuse or {}
+        config = config or self.plugin_config
+        cfg = config.pipeline
+        step_map = dict(self.STEP_REGISTRY)
+        self._build_ms = {}
+        if cfg.lock_order:
+            names = [name for name, _ in self.STEP_REGISTRY if name in cfg._steps]
         else:
-            step_map = dict(self.STEP_REGISTRY)
-            for name in self.cfg._steps:
-                cls = step_map.get(name)
-                if not cls:
-                    logger.warning(f"未知的步骤: {name}")
-                    continue
-                step = cls(self.plugin_config)
-                self._steps.append(step)
+            names = cfg._steps
+
+        steps: list[BaseStep] = []
+        for name in names:
+            if name in reuse:
+                steps.append(reuse[name])
+                continue
+            path = step_map.get(name)
+            if not path:
+                logger.warning(f"未知的步骤: {name}")
+                continue
+            start = time.perf_counter()
+            steps.append(self._step_class(path)(config))
+            self._build_ms[name] = (time.perf_counter() - start) * 1000
+        return steps
+
+    @staticmethod
+    def _step_class(path: str) -> type[BaseStep]:
+        """按需导入步骤模块（模块已导入时只是一次字典查找）"""
+        module, _, cls = path.rpartition(".")
+        return getattr(importlib.import_module(f".step.{module}", __package__), cls)
 
     # =================== Lifecycle =======================
 
     async def initialize(self) -> None:
-        """初始化所有步骤"""
-        for step in self._steps:
+        """并发初始化所有步骤，并记录启动耗时"""
+        start = time.perf_counter()
+        await asyncio.gather(
+            self._initialize_steps(self._steps),
+            self._build_keywords(),
+            self._start_state(),
+        )
+        self._start_export()
+        total = (time.perf_counter() - start) * 1000
+        logger.info(f"输出管道初始化完成，耗时 {total:.1f}ms")
+
+    async def _initialize_steps(self, steps: list[BaseStep]) -> None:
+        """并发执行 initialize，按步骤输出 构建 / 初始化 耗时"""
+
+        async def _init(step: BaseStep) -> float:
+            start = time.perf_counter()
             await step.initialize()
+            return (time.perf_counter() - start) * 1000
+
+        costs = await asyncio.gather(*(_init(step) for step in steps))
+        if steps:
+            logger.info(
+                "步骤启动耗时(构建/初始化)："
+                + "，".join(
+                    f"{step.name.value} {self._build_ms.get(step.name.value, 0):.1f}"
+                    f"/{cost:.1f}ms"
+                    for step, cost in zip(steps, costs)
+                )
+            )
+
+    async def _terminate_steps(self, steps: list[BaseStep]) -> None:
+        """并发执行 terminate，单个步骤出错不影响其余步骤"""
+        results = await asyncio.gather(
+            *(step.terminate() for step in steps), return_exceptions=True
+        )
+        for step, result in zip(steps, results):
+            if isinstance(result, BaseException):
+                logger.error(f"终止步骤 {step.name.value} 失败: {result}")
 
     async def terminate(self) -> None:
         """终止所有步骤"""
-        for step in self._steps:
-            await step.terminate()
+        await self._terminate_steps(self._steps)
+
+        if await self._stop_export():
+            self._export_metrics()
+        await self._stop_state()
+
+    # =================== Hot reload =======================
+
+    async def reload(self, data: Mapping[str, Any]) -> str:
+        """
+        热重载：对比新旧配置，仅重建配置段（含 BaseStep.sections 声明的依赖段）发生变化的步骤，
+        其余步骤原样复用；新执行计划一次性切换，处理中的消息继续走旧计划。
+        新步骤与关键词自动机先按暂存配置构建，全部成功后配置、自动机与计划才一起生效，
+        构建失败时当前配置保持不变。返回重载结果描述
+        """
+        async with self._reload_lock:
+            staged, changed = self.plugin_config.stage(data)
+            if not changed:
+                return "配置未变化，无需重载"
+
+            old = {step.name: step for step in self._steps}
+            reuse = {
+                name: step
+                for name, step in old.items()
+                if name not in changed and not step.sections.intersection(changed)
+            }
+            try:
+                steps = self._build_steps(reuse, staged)
+                if changed.intersection(staged._KEYWORD_SECTIONS):
+                    await asyncio.to_thread(lambda: staged.keyword_engine)
+            except Exception as e:
+                logger.error(f"热重载失败，沿用当前配置: {e}")
+                return f"热重载失败，沿用当前配置：{e}"
+
+            created = [step for step in steps if step.name not in reuse]
+            for step in created:
+                if prev := old.get(step.name):
+                    step.adopt(prev)
+            await self._initialize_steps(created)
+
+            # 原子切换（之间没有 await）：run() 在入口处取走计划，切换不影响处理中的消息
+            self.plugin_config.commit(staged, changed)
+            for step in created:
+                step.plugin_config = self.plugin_config
+            self.cfg = self.plugin_config.pipeline
+            self._steps, self._plans = steps, {}
+
+            names = {step.name for step in steps}
+            removed = [step for name, step in old.items() if name not in names]
+            await self._terminate_steps(removed)
+
+            if "metrics" in changed:
+                await self._stop_export()
+                self._start_export()
+            if changed.intersection(("state", "block")):
+                StateManager.configure(
+                    self.plugin_config.state, self.plugin_config.block.reread_window
+                )
+            if "state" in changed:
+                await self._stop_state()
+                await self._start_state()
+            if "send" in changed:
+                self.plugin_config.outbox.configure(self.plugin_config.send)
+
+            version = self.plugin_config.version
+            rebuilt = [step.name.value for step in created]
+            dropped = [step.name.value for step in removed]
+            msg = (
+                f"配置已热重载(v{version})：变更 {sorted(changed)}，"
+                f"重建步骤 {rebuilt or '无'}，移除步骤 {dropped or '无'}"
+            )
+            logger.info(msg)
+            return msg
+
+    async def _build_keywords(self) -> None:
+        """在线程中预先构建关键词自动机，避免首条消息阻塞事件循环"""
+        engine = await asyncio.to_thread(
+            lambda: self.plugin_config.keyword_engine
+        )
+        logger.debug(f"关键词自动机已构建：{len(engine)} 个关键词")
+
+    # =================== State snapshot =======================
+
+    async def _start_state(self) -> None:
+        cfg = self.plugin_config.state
+        if not cfg.persist:
+            return
+        path = self.plugin_config.data_dir / "state.db"
+        try:
+            store = await asyncio.to_thread(StateStore, path)
+        except Exception as e:
+            logger.error(f"打开群状态快照失败: {e}")
+            return
+        StateManager.attach_store(store)
+        if cfg.snapshot_interval > 0:
+            self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+
+    async def _stop_state(self) -> None:
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
+            await asyncio.gather(self._snapshot_task, return_exceptions=True)
+            self._snapshot_task = None
+
+        store = StateManager._store
+        if store is None:
+            return
+        if StateManager._flushing is not None:
+            await asyncio.gather(StateManager._flushing, return_exceptions=True)
+        try:
+            count = await StateManager.snapshot()
+            logger.debug(f"已快照 {count} 个群的状态")
+        except Exception as e:
+            logger.error(f"快照群状态失败: {e}")
+        StateManager.attach_store(None)
+        await asyncio.to_thread(store.close)
+
+    async def _snapshot_loop(self) -> None:
+        """定期快照群状态"""
+        while True:
+            await asyncio.sleep(self.plugin_config.state.snapshot_interval)
+            try:
+                await StateManager.snapshot()
+            except Exception as e:
+                logger.warning(f"快照群状态失败: {e}")
+
+    # =================== Metrics =======================
+
+    def report(self) -> str:
+        """运行统计报表（供管理员命令查看）"""
+        state = StateManager.stats()
+        lines = [
+            self.metrics.render(),
+            self.plugin_config.outbox.render(),
+            *(
+                f"{step.name.value}：" + " ".join(f"{k}={v}" for k, v in stats.items())
+                for step, stats in self._step_stats()
+            ),
+            f"群状态：常驻 {state['groups']} 个群，约 {state['resident_bytes'] // 1024} KB，"
+            f"淘汰 {state['evictions']}",
+        ]
+        return "\n".join(lines)
+
+    def _export_data(self) -> dict[str, Any]:
+        data = self.metrics.snapshot()
+        data["state"] = StateManager.stats()
+        data["outbox"] = self.plugin_config.outbox.stats()
+        data["step_stats"] = {step.name.value: stats for step, stats in self._step_stats()}
+        return data
+
+    def _step_stats(self) -> list[tuple[BaseStep, dict[str, Any]]]:
+        return [(step, stats) for step in self._steps if (stats := step.stats())]
+
+    def _export_metrics(self, data: dict[str, Any] | None = None) -> None:
+        try:
+            write_json(
+                self.plugin_config.data_dir / "metrics.json",
+                data or self._export_data(),
+            )
+        except Exception as e:
+            logger.warning(f"导出统计数据失败: {e}")
+
+    async def _export_loop(self) -> None:
+        """定期导出统计数据（在事件循环内取快照，文件写入放到线程）"""
+        while True:
+            await asyncio.sleep(self.plugin_config.metrics.export_interval)
+            await asyncio.to_thread(self._export_metrics, self._export_data())
+
+    def _start_export(self) -> None:
+        if self.plugin_config.metrics.export_interval > 0:
+            self._export_task = asyncio.create_task(self._export_loop())
+
+    async def _stop_export(self) -> bool:
+        """停止定期导出，返回此前是否在运行"""
+        if not self._export_task:
+            return False
+        self._export_task.cancel()
+        await asyncio.gather(self._export_task, return_exceptions=True)
+        self._export_task = None
+        return True
 
     # ==================== run =====================
 
-    def _llm_allow(self, step: BaseStep, is_llm: bool) -> bool:
-        return not self.cfg.is_llm_step(step.name) or is_llm
+    def _allow(self, step: BaseStep, is_llm: bool, platform: str) -> bool:
+        if not is_llm and (step.llm_only or self.cfg.is_llm_step(step.name)):
+            return False
+        if step.platforms is not None and platform not in step.platforms:
+            return False
+        return True
+
+    def _plan(self, is_llm: bool, platform: str) -> _Plan:
+        """
+        按 (is_llm, 平台) 编译并缓存执行计划
+        """
+        key = (is_llm, platform)
+        plan = self._plans.get(key)
+        if plan is None:
+            run: list[BaseStep] = []
+            skipped: list[str] = []
+            for step in self._steps:
+                if self._allow(step, is_llm, platform):
+                    run.append(step)
+                else:
+                    skipped.append(step.name)
+            prefetchers = tuple(
+                step for step in run if type(step).prefetch is not BaseStep.prefetch
+            )
+            plan = self._plans[key] = (tuple(run), tuple(skipped), prefetchers)
+            logger.debug(
+                f"已编译执行计划 {key}: {[step.name.value for step in run]}"
+            )
+        return plan
 
     async def run(self, ctx: OutContext) -> bool:
         """
         运行 pipeline
         """
-        for step in self._steps:
-            if not self._llm_allow(step, ctx.is_llm):
+        metrics = self.metrics
+        verbose = debug_enabled()
+        steps, skipped, prefetchers = self._plan(
+            ctx.is_llm, ctx.event.get_platform_name()
+        )
+        for name in skipped:
+            metrics.skip(name, ctx.is_llm)
+
+        if prefetchers:
+            # 预取与前面的步骤并发进行，各步骤在 handle 中取结果
+            ctx.prefetches = {
+                step.name: asyncio.create_task(coro)
+                for step in prefetchers
+                if (coro := step.prefetch(ctx)) is not None
+            }
+        timings: list[tuple[str, float]] = []
+        start = time.perf_counter()
+        try:
+            return await self._run_steps(ctx, steps, verbose, timings)
+        finally:
+            if ctx.gid:
+                metrics.observe_group(ctx.gid, time.perf_counter() - start, timings)
+            if ctx.prefetches:
+                self._cancel_prefetches(ctx.prefetches)
+
+    @staticmethod
+    def _cancel_prefetches(tasks: Mapping[Any, asyncio.Task]) -> None:
+        """取消未被用到的预取（前面的步骤中止或本步骤被跳过）"""
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # 取走异常，避免 "exception was never retrieved"
+
+    async def _run_steps(
+        self,
+        ctx: OutContext,
+        steps: tuple[BaseStep, ...],
+        verbose: bool,
+        timings: list[tuple[str, float]],
+    ) -> bool:
+        """依次执行步骤，timings 收集 (步骤名, 耗时) 供按群统计"""
+        metrics = self.metrics
+        for i, step in enumerate(steps):
+            # 消息链已被清空（如外显、撤回已自行发送），后续步骤无事可做
+            if not ctx.chain:
+                for rest in steps[i:]:
+                    metrics.skip(rest.name, ctx.is_llm)
+                break
+
+            if not step.accepts(ctx):
+                metrics.skip(step.name, ctx.is_llm)
                 continue
 
-            result = await step.handle(ctx)
+            name = step.name.value
+            start = time.perf_counter()
+            try:
+                result = await step.handle(ctx)
+            except Exception:
+                elapsed = time.perf_counter() - start
+                metrics.observe(name, ctx.is_llm, elapsed, None)
+                timings.append((name, elapsed))
+                raise
+            elapsed = time.perf_counter() - start
+            metrics.observe(name, ctx.is_llm, elapsed, result)
+            timings.append((name, elapsed))
             if result.msg:
-                if result.ok:
-                    logger.debug(result.msg)
-                else:
-                    logger.warning(result.msg)
+                if not result.ok:
+                    logger.warning(result.message())
+                elif verbose and (msg := result.message()):
+                    logger.debug(msg)
 
             if result.abort:
                 return False
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import (
+    BrokenExecutor,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from pathlib import Path
+from typing import Any
+
+from .metrics import LatencyHistogram
+from .model import debug_enabled
+from .render_worker import Encoding, Rendered, _render, _warm
+
+
+def paginate(text: str, size: int) -> list[str]:
+    """
+    把 Markdown 文本按段落切成每页约 size 字的若干页（size <= 0 不切）：
+    代码块整块保留，超长段落按行切，超长单行按字数硬切
+    """
+    if size <= 0 or len(text) <= size:
+        return [text]
+
+    blocks: list[str] = []
+    buf: list[str] = []
+    fence = False
+    for line in text.split("\n"):
+        if line.lstrip().startswith(("```", "~~~")):
+            fence = not fence
+        if not fence and not line.strip():
+            if buf:
+                blocks.append("\n".join(buf))
+                buf = []
+            continue
+        buf.append(line)
+    if buf:
+        blocks.append("\n".join(buf))
+
+    # (片段, 与前一片段的分隔符)
+    units: list[tuple[str, str]] = []
+    for block in blocks:
+        if len(block) <= size or block.lstrip().startswith(("```", "~~~")):
+            units.append((block, "\n\n"))
+            continue
+        sep = "\n\n"
+        for line in block.split("\n"):
+            for i in range(0, max(len(line), 1), size):
+                units.append((line[i : i + size], sep))
+                sep = ""
+            sep = "\n"
+
+    pages: list[str] = []
+    current = ""
+    for unit, sep in units:
+        if current and len(current) + len(sep) + len(unit) > size:
+            pages.append(current)
+            current = unit
+        else:
+            current = f"{current}{sep}{unit}" if current else unit
+    if current:
+        pages.append(current)
+    return pages
+
+
+# =================== 事件循环端 =======================
+
+
+class RenderPool:
+    """
+    pillowmd 渲染池：渲染、图片编码与写盘都在 worker 中完成，不占用事件循环。
+
+    - mode="thread"：线程池，每个线程首次渲染时加载一份样式
+    - mode="process"：进程池（spawn），每个子进程启动时加载一次样式与字体，
+      绕开 GIL，适合高并发长文
+    - 同时提交给 worker 的渲染数不超过 workers，其余在事件循环侧排队（计入 queued）
+    """
+
+    MODES = ("thread", "process")
+
+    SAMPLE_EVERY = 20
+    """非默认编码时每隔多少次渲染额外测量一次默认 PNG 大小（调试日志开启时每次都测）"""
+
+    def __init__(self, style_dir: str, mode: str = "thread", workers: int = 2):
+        self.style_dir = str(Path(style_dir).resolve())
+        self.mode = mode if mode in self.MODES else "thread"
+        self.workers = max(workers, 1)
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(self.workers)
+        self.warmed = False
+        """已在 worker 中预加载过样式"""
+
+        self.queued = 0
+        """当前排队等待 worker 的渲染数"""
+        self.peak_queued = 0
+        """排队深度峰值"""
+        self.rendering = 0
+        """当前正在渲染的数量"""
+        self.rendered = 0
+        self.failed = 0
+        self.bytes_out = 0
+        """累计写盘字节数"""
+        self.sampled = 0
+        """测量过默认 PNG 大小的渲染数"""
+        self._encodes = 0
+        """非默认编码的渲染数，按此抽样"""
+        self._sample_size = 0
+        self._sample_original = 0
+        """抽样渲染的实际 / 默认 PNG 字节数之和，用于估算节省比例"""
+        self.wait = LatencyHistogram()
+        """排队耗时"""
+        self.latency = LatencyHistogram()
+        """单次渲染（含写盘）耗时"""
+
+    def same(self, other: RenderPool) -> bool:
+        """样式与池配置一致，可直接沿用"""
+        return (self.style_dir, self.mode, self.workers) == (
+            other.style_dir,
+            other.mode,
+            other.workers,
+        )
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm,
+                    initargs=(self.style_dir,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="t2i-render"
+                )
+        return self._executor
+
+    async def warm(self) -> float:
+        """
+        启动 worker 并预加载样式（每个 worker 提交一次），返回耗时（秒）。
+        线程池中空闲线程可能连续领取多个预加载任务，此时其余线程在首次渲染时再加载
+        """
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        await asyncio.gather(
+            *(loop.run_in_executor(pool, _warm, self.style_dir) for _ in range(self.workers))
+        )
+        self.warmed = True
+        return time.perf_counter() - start
+
+    async def render(
+        self,
+        text: str,
+        auto_page: bool,
+        out_dir: Path,
+        name: str = "",
+        enc: Encoding = Encoding(),
+    ) -> Rendered:
+        """在 worker 中渲染 text，按 enc 编码后写入 out_dir"""
+        self.queued += 1
+        if self.queued > self.peak_queued:
+            self.peak_queued = self.queued
+        start = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.wait.observe(time.perf_counter() - start)
+
+        measure = False
+        if not enc.default:
+            measure = debug_enabled() or self._encodes % self.SAMPLE_EVERY == 0
+            self._encodes += 1
+        self.rendering += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._pool(),
+                _render,
+                self.style_dir,
+                text,
+                auto_page,
+                str(out_dir),
+                name,
+                enc,
+                measure,
+            )
+            self.rendered += 1
+            self.bytes_out += result.size
+            if result.original:
+                self.sampled += 1
+                self._sample_size += result.size
+                self._sample_original += result.original
+            return result
+        except BrokenExecutor:
+            # 子进程崩溃后整个池不可用，下次渲染时重建
+            self.failed += 1
+            self._executor = None
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.rendering -= 1
+            self.latency.observe(time.perf_counter() - start)
+            self._slots.release()
+
+    def close_nowait(self) -> None:
+        """不等待地关闭：已提交的渲染照常完成，worker 随后退出"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    async def close(self) -> None:
+        """关闭池并在线程中等待 worker 退出"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "rendering": self.rendering,
+            "rendered": self.rendered,
+            "render_failed": self.failed,
+            "bytes_out": self.bytes_out,
+            "saved_pct": round(
+                (1 - self._sample_size / self._sample_original) * 100, 1
+            )
+            if self._sample_original
+            else 0.0,
+            "saved_samples": self.sampled,
+            "queue_p95_ms": round(self.wait.percentile(0.95) * 1000, 3),
+            "render_p50_ms": round(self.latency.percentile(0.50) * 1000, 3),
+            "render_p95_ms": round(self.latency.percentile(0.95) * 1000, 3),
+        }
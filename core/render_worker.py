@@ -0,0 +1,144 @@
+"""
+渲染 worker 端：在线程池线程或 spawn 子进程中执行，只依赖参数与本 worker 的样式缓存。
+
+子进程按模块路径导入本模块，因此这里只能依赖标准库与 pillowmd / PIL，
+不能导入插件其他模块（会连带导入 AstrBot）
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import secrets
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+@dataclass(frozen=True, slots=True)
+class Encoding:
+    """渲染结果的编码方式（随任务传给 worker，须可 pickle）"""
+
+    format: str = "png"
+    """png / webp / jpeg"""
+    quality: int = 85
+    """webp / jpeg 的质量（1~100）"""
+    max_width: int = 0
+    """宽度上限（像素），超出按比例缩小，0 表示不缩放"""
+    colors: int = 0
+    """png 调色板颜色数（2~256），0 表示不量化"""
+
+    FORMATS = ("png", "webp", "jpeg")
+
+    @property
+    def default(self) -> bool:
+        """与 pillowmd 默认输出（原尺寸 PNG）一致"""
+        return self.format == "png" and not self.max_width and not self.colors
+
+
+@dataclass(slots=True)
+class Rendered:
+    path: Path
+    size: int
+    """写盘字节数"""
+    original: int = 0
+    """按 pillowmd 默认方式（原尺寸 PNG）编码的字节数，0 表示未测量（默认编码或未抽样）"""
+
+    @property
+    def saved(self) -> int:
+        return self.original - self.size if self.original else 0
+
+
+_local = threading.local()
+"""每个 worker（线程 / 子进程）各自持有的样式：样式目录 -> MdStyle。
+样式中的图片素材按需惰性解码，不在线程间共享；字体由 pillowmd 在进程内缓存"""
+
+
+def _style(style_dir: str) -> Any:
+    styles: dict[str, Any] | None = getattr(_local, "styles", None)
+    if styles is None:
+        styles = _local.styles = {}
+    style = styles.get(style_dir)
+    if style is None:
+        import pillowmd
+
+        style = styles[style_dir] = pillowmd.LoadMarkdownStyles(Path(style_dir))
+    return style
+
+
+_WARM_TEXT = "# 预热 Warm-up\n\n正文 **粗体** `code` 123 abc"
+"""预热渲染用的样例文本：pillowmd 的字体在首次渲染时才加载"""
+
+
+def _warm(style_dir: str) -> None:
+    """预先加载样式并试渲染一次，载入字体（也用作子进程的 initializer）"""
+    _style(style_dir).Render(text=_WARM_TEXT)
+
+
+_WEBP_MAX = 16383
+"""WebP 单边像素上限，超出时改存 PNG"""
+
+
+def _encode(
+    result: Any, out_dir: Path, name: str, enc: Encoding, measure: bool
+) -> Rendered:
+    """
+    按 enc 编码并写入 out_dir/name + 扩展名（GIF 与默认编码交给 pillowmd 保存）。
+    measure 为 True 时额外在内存中按默认 PNG 编码一次，用于估算节省的字节数
+    """
+    if result.imageType == "gif" or enc.default:
+        path = Path(result.Save(out_dir))
+        if name:
+            dst = path.with_name(f"{name}{path.suffix}")
+            os.replace(path, dst)
+            path = dst
+        return Rendered(path, path.stat().st_size)
+
+    from PIL import Image
+
+    img = result.image
+    original = 0
+    if measure:
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        original = buf.tell()
+
+    if enc.max_width and img.width > enc.max_width:
+        height = max(round(img.height * enc.max_width / img.width), 1)
+        img = img.resize((enc.max_width, height), Image.Resampling.LANCZOS)
+
+    fmt = enc.format
+    if fmt == "webp" and max(img.size) > _WEBP_MAX:
+        fmt = "png"
+    options: dict[str, Any] = {}
+    if fmt == "jpeg":
+        if img.mode != "RGB":
+            # JPEG 不支持透明：铺在白底上
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        options = {"quality": enc.quality, "optimize": True, "progressive": True}
+    elif fmt == "webp":
+        options = {"quality": enc.quality, "method": 4}
+    elif enc.colors:
+        img = img.quantize(min(max(enc.colors, 2), 256), method=Image.Quantize.FASTOCTREE)
+
+    suffix = ".jpg" if fmt == "jpeg" else f".{fmt}"
+    path = out_dir / f"{name or secrets.token_hex(8)}{suffix}"
+    img.save(path, fmt.upper(), **options)
+    return Rendered(path, path.stat().st_size, original)
+
+
+def _render(
+    style_dir: str,
+    text: str,
+    auto_page: bool,
+    out_dir: str,
+    name: str,
+    enc: Encoding,
+    measure: bool,
+) -> Rendered:
+    """渲染、编码并写入 out_dir，name 非空时以 name 为文件名"""
+    result = _style(style_dir).Render(text=text, useImageUrl=True, autoPage=auto_page)
+    return _encode(result, Path(out_dir), name, enc, measure)
@@ -1,16 +1,45 @@
-from .at import AtStep
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from .base import BaseStep
-from .block import BlockStep
-from .clean import CleanStep
-from .error import ErrorStep
-from .forward import ForwardStep
-from .recall import RecallStep
-from .replace import ReplaceStep
-from .reply import ReplyStep
-from .split import SplitStep
-from .summary import SummaryStep
-from .t2i import T2IStep
-from .tts import TTSStep
+
+if TYPE_CHECKING:
+    from .at import AtStep
+    from .block import BlockStep
+    from .clean import CleanStep
+    from .error import ErrorStep
+    from .forward import ForwardStep
+    from .recall import RecallStep
+    from .replace import ReplaceStep
+    from .reply import ReplyStep
+    from .split import SplitStep
+    from .summary import SummaryStep
+    from .t2i import T2IStep
+    from .tts import TTSStep
+
+# 步骤类 -> 所在模块；首次访问时才导入（各步骤依赖的 emoji / aiocqhttp 等较重）
+_LAZY = {
+    "AtStep": "at",
+    "BlockStep": "block",
+    "CleanStep": "clean",
+    "ErrorStep": "error",
+    "ForwardStep": "forward",
+    "RecallStep": "recall",
+    "ReplaceStep": "replace",
+    "ReplyStep": "reply",
+    "SplitStep": "split",
+    "SummaryStep": "summary",
+    "T2IStep": "t2i",
+    "TTSStep": "tts",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(f".{module}", __name__), name)
+
 
 __all__ = [
     "ForwardStep",
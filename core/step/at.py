@@ -1,6 +1,9 @@
+import asyncio
 import random
 import re
+import time
 
+from astrbot.api import logger
 from astrbot.core.message.components import (
     At,
     BaseMessageComponent,
@@ -11,7 +14,8 @@ from astrbot.core.message.components import (
 )
 
 from ..config import PluginConfig
-from ..model import OutContext, StepName, StepResult
+from ..model import GroupState, OutContext, StateManager, StepName, StepResult
+from ..nickname import MemberDirectory
 from .base import BaseStep
 
 
@@ -20,6 +24,8 @@ class AtStep(BaseStep):
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.at
+        self._loading: dict[str, asyncio.Task] = {}
+        """群号 -> 正在加载的成员目录任务"""
 
         self.at_head_regex = re.compile(
             r"^\s*(?:"
@@ -31,6 +37,63 @@ class AtStep(BaseStep):
             re.IGNORECASE,
         )
 
+    async def terminate(self):
+        tasks = list(self._loading.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loading.clear()
+
+    def adopt(self, old: BaseStep):
+        """接管正在加载的成员目录"""
+        if isinstance(old, AtStep):
+            self._loading = old._loading
+
+    # -------------------------
+    # 群成员目录
+    # -------------------------
+    def _refresh_members(self, ctx: OutContext) -> None:
+        """成员目录缺失或过期时在后台重新拉取，不阻塞当前消息"""
+        ttl = self.cfg.member_ttl
+        if ttl <= 0 or not ctx.gid or ctx.gid in self._loading:
+            return
+        if ctx.event.get_platform_name() != "aiocqhttp":
+            return
+        members = ctx.group.members
+        if members is not None and time.monotonic() - members.loaded_at < ttl:
+            return
+        task = asyncio.create_task(self._load_members(ctx.event.bot, ctx.group))  # type: ignore[attr-defined]
+        self._loading[ctx.gid] = task
+        task.add_done_callback(lambda _: self._loading.pop(ctx.gid, None))
+
+    async def _load_members(self, client, group: GroupState) -> None:
+        try:
+            members = await client.get_group_member_list(group_id=int(group.gid))
+            group.members = await asyncio.to_thread(
+                MemberDirectory, members, self.cfg.member_limit, time.monotonic()
+            )
+            StateManager.touch(group.gid)
+            logger.debug(
+                f"已加载群 {group.gid} 的成员目录："
+                f"收录 {len(group.members)} 个名字 / 共 {group.members.total} 人"
+            )
+        except Exception as e:
+            # 记下失败时间：沿用旧目录（没有则置空），等下一个 member_ttl 再重试
+            if group.members is not None:
+                group.members.loaded_at = time.monotonic()
+            else:
+                group.members = MemberDirectory([], 0, time.monotonic())
+            logger.warning(f"加载群 {group.gid} 的成员列表失败: {e}")
+
+    def _match_name(self, group: GroupState, text: str, start: int):
+        """在最近发言者与成员目录中取最长的已知昵称"""
+        hit = group.name_trie.match(text, start)
+        if group.members is not None:
+            other = group.members.trie.match(text, start)
+            if other and (not hit or other[2] > hit[2]):
+                hit = other
+        return hit
+
     # -------------------------
     # 基础判断
     # -------------------------
@@ -61,40 +124,52 @@ class AtStep(BaseStep):
     # -------------------------
     def _parse_fake_at(self, ctx: OutContext):
         """
-        只识别，不修改
+        只识别，不修改。
+        返回 (节点下标, QQ, 昵称, 假 at 前缀在该节点文本中的结束位置)
         """
         for idx, seg in enumerate(ctx.chain):
             if not isinstance(seg, Plain) or not seg.text:
                 continue
 
-            m = self.at_head_regex.match(seg.text)
+            text = seg.text
+            m = self.at_head_regex.match(text)
             if not m:
                 # 当前节点不匹配，继续扫描后续节点
                 continue
 
             qq = m.group(1) or m.group(3)
             nickname = m.group(2) or m.group(4)
+            end = m.end()
 
             if nickname:
                 nickname = nickname.strip()
 
-            if not qq and nickname and len(ctx.group.name_to_qq) > 0:
-                qq = ctx.group.name_to_qq.get(nickname)
-
-                # 模糊匹配：去掉括号内容后再查一次
-                if not qq:
-                    bare = re.sub(r"[（(].+?[)）]", "", nickname).strip()
-                    if bare and bare != nickname:
-                        qq = ctx.group.name_to_qq.get(bare)
-
-            return idx, qq, nickname
-
-        return None, None, None
+            if not qq and nickname:
+                # 在昵称前缀树中取最长的已知昵称（已含全半角、括号备注等别名）
+                if m.group(2):
+                    hit = self._match_name(ctx.group, text, m.start(2))
+                    # [at:昵称] 须整段命中
+                    if hit and text[hit[2] : m.end(2)].strip():
+                        hit = None
+                    members = ctx.group.members
+                    if not hit and members is not None:
+                        qq = members.get(nickname)
+                else:
+                    hit = self._match_name(ctx.group, text, m.start(4))
+                    # @昵称 后面紧跟的正文不属于昵称
+                    if hit:
+                        end = len(text) - len(text[hit[2] :].lstrip())
+                if hit:
+                    qq, nickname, _ = hit
+
+            return idx, qq, nickname, end
+
+        return None, None, None, 0
 
     # -------------------------
     # 应用假 at（真正修改）
     # -------------------------
-    def _apply_fake_at(self, chain, idx, qq, nickname):
+    def _apply_fake_at(self, chain, idx, qq, nickname, end):
         if idx is None:
             return
 
@@ -103,7 +178,7 @@ class AtStep(BaseStep):
             return
 
         # 删除假 at 前缀
-        seg.text = self.at_head_regex.sub("", seg.text, count=1)
+        seg.text = seg.text[end:]
 
         if not seg.text:
             chain.pop(idx)
@@ -118,9 +193,11 @@ class AtStep(BaseStep):
     # 主入口
     # -------------------------
     async def handle(self, ctx: OutContext) -> StepResult:
+        self._refresh_members(ctx)
+
         # ===== 1. 假艾特解析 =====
-        idx, qq, nickname = self._parse_fake_at(ctx)
-        self._apply_fake_at(ctx.chain, idx, qq, nickname)
+        idx, qq, nickname, end = self._parse_fake_at(ctx)
+        self._apply_fake_at(ctx.chain, idx, qq, nickname, end)
 
         # ===== 2. 智能艾特 =====
         if not (
@@ -140,7 +217,7 @@ class AtStep(BaseStep):
                 qq=ctx.uid,
                 nickname=name,
             )
-            return StepResult(msg=f"已插入组件@{name}({ctx.uid})")
+            return StepResult(msg=lambda: f"已插入组件@{name}({ctx.uid})")
 
         # 未命中 → 清除所有 at
         elif not hit and has_at:
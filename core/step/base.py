@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from collections.abc import Awaitable
+from typing import Any
 
 from ..config import PluginConfig
 from ..model import OutContext, StepName, StepResult
@@ -8,14 +10,35 @@ class BaseStep(ABC):
     """
     所有步骤的基类。
     子类必须实现 handle()
+
+    前置条件（由 Pipeline 统一检查，满足后才调用 handle）：
+    - platforms：适用的平台，编译执行计划时按平台过滤
+    - llm_only：是否仅作用于 LLM 回复（与 pipeline.llm_steps 取并集）
+    - accepts()：消息链形状检查，每条消息运行时检查
     """
 
     #: 步骤名（必须覆盖）
     name: StepName
 
+    #: 适用的平台名（None 表示不限平台）
+    platforms: frozenset[str] | None = None
+
+    #: 是否仅作用于 LLM 回复
+    llm_only: bool = False
+
+    #: 除同名配置段外，构建时还读取的配置段；其中任一段热重载变化时同样重建本步骤
+    sections: frozenset[str] = frozenset()
+
     def __init__(self, config: PluginConfig):
         self.plugin_config = config
 
+    def accepts(self, ctx: OutContext) -> bool:
+        """
+        消息链形状前置检查，不满足则跳过本步骤。
+        必须廉价且只读；调用时 ctx.chain 保证非空。
+        """
+        return True
+
     @abstractmethod
     async def handle(self, ctx: OutContext) -> StepResult:
         """
@@ -34,5 +57,37 @@ class BaseStep(ABC):
         """
         ...  # 子类必须覆盖此处
 
+    def prefetch(self, ctx: OutContext) -> Awaitable[Any] | None:
+        """
+        可选的预取钩子：消息进入流水线时由 Pipeline 调用，
+        返回的协程与前面的步骤并发执行，handle 中通过 prefetched(ctx) 取结果。
+        只适合与消息链内容无关的 IO（如拉取登录信息）；无需预取时返回 None。
+        流水线提前结束（前面的步骤中止、消息链被清空）时预取会被取消
+        """
+        return None
+
+    async def prefetched(self, ctx: OutContext) -> Any:
+        """等待并返回本步骤的预取结果；未预取或预取失败时返回 None"""
+        task = ctx.prefetches.get(self.name) if ctx.prefetches else None
+        if task is None:
+            return None
+        try:
+            return await task
+        except Exception:
+            return None
+
+    def adopt(self, old: "BaseStep") -> None:
+        """
+        热重载时由新实例调用，从被替换的旧实例接管运行时状态
+        （如未完成的后台任务、已加载的资源）。旧实例不会再被 terminate。
+        """
+
+    def stats(self) -> dict[str, Any] | None:
+        """
+        步骤自身的运行时统计（如缓存命中率），随 outstats 与 metrics.json 输出。
+        无统计返回 None
+        """
+        return None
+
     async def initialize(self) -> None: ...
     async def terminate(self) -> None: ...
@@ -1,6 +1,7 @@
 import time
 
 from ..config import PluginConfig
+from ..fingerprint import fingerprint, simhash
 from ..model import OutContext, StepName, StepResult
 from .base import BaseStep
 
@@ -22,18 +23,23 @@ class BlockStep(BaseStep):
     async def _block_reread(self, ctx: OutContext) -> StepResult | None:
         if not self.cfg.block_reread:
             return None
-        if ctx.plain in ctx.group.bot_msgs:
+        history = ctx.group.bot_msgs
+        if fingerprint(ctx.plain) in history:
             ctx.event.set_result(ctx.event.plain_result(""))
             return StepResult(abort=True, msg=f"已拦截流口水消息: {ctx.plain}")
+        if self.cfg.reread_similarity > 0 and history.near(
+            simhash(ctx.plain), self.cfg._max_distance
+        ):
+            ctx.event.set_result(ctx.event.plain_result(""))
+            return StepResult(abort=True, msg=f"已拦截近似流口水消息: {ctx.plain}")
 
     async def _block_words(self, ctx: OutContext) -> StepResult | None:
-        for word in self.cfg.block_words:
-            if word in ctx.plain:
-                ctx.event.set_result(ctx.event.plain_result(""))
-                return StepResult(
-                    abort=True,
-                    msg=f"已拦截人机话术: {ctx.plain}",
-                )
+        if ctx.keyword_hit(self.plugin_config.keyword_engine, "block"):
+            ctx.event.set_result(ctx.event.plain_result(""))
+            return StepResult(
+                abort=True,
+                msg=f"已拦截人机话术: {ctx.plain}",
+            )
 
     # ================== 主入口 ==================
 
@@ -48,6 +54,7 @@ class BlockStep(BaseStep):
                 return result
 
         if ctx.is_llm:
-            ctx.group.bot_msgs.append(ctx.plain)
+            sim = simhash(ctx.plain) if self.cfg.reread_similarity > 0 else None
+            ctx.group.bot_msgs.add(fingerprint(ctx.plain), sim)
 
         return StepResult()
@@ -1,24 +1,129 @@
 import re
 from collections import defaultdict
+from functools import lru_cache
 
 import emoji
 
 from astrbot.core.message.components import Plain
 
-from ..config import PluginConfig
-from ..model import OutContext, StepName, StepResult
+from ..config import CleanConfig, PluginConfig
+from ..model import OutContext, StepName, StepResult, debug_enabled
 from .base import BaseStep
 
 
+@lru_cache(maxsize=1)
+def emoji_char_class() -> str:
+    """
+    由 emoji.EMOJI_DATA 预计算的码位表（正则字符类内容，已合并为区间）。
+    收录 emoji 序列中出现的全部非 ASCII 码位（含 ZWJ、变体选择符、肤色修饰符），
+    键帽序列中的数字与 #* 不在其中
+    """
+    points = sorted({ord(c) for e in emoji.EMOJI_DATA for c in e if ord(c) > 0x7F})
+    ranges: list[tuple[int, int]] = []
+    for cp in points:
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], cp)
+        else:
+            ranges.append((cp, cp))
+    return "".join(
+        re.escape(chr(lo)) if lo == hi else f"{re.escape(chr(lo))}-{re.escape(chr(hi))}"
+        for lo, hi in ranges
+    )
+
+
+class TextCleaner:
+    """
+    由 CleanConfig 一次性构建的文本清理器：
+
+    - 中括号 / 圆括号 / 情绪标签 / emoji 合成一个正则，一次扫描完成
+    - 句首 / 句尾为常数级的字符串比较
+    - 整体清洗的标点正则预编译，再扫描一次
+
+    与逐项清理的差异：各项在同一遍中按出现位置从左到右摘除，
+    而不是先删完中括号再找圆括号（仅在不同括号相互交错时结果不同）
+    """
+
+    _LABELS = {
+        "bracket": "中括号内容",
+        "paren": "圆括号内容",
+        "emotion": "情绪标签",
+        "emoji": "Emoji",
+    }
+
+    def __init__(self, cfg: CleanConfig):
+        parts: list[str] = []
+        if cfg.bracket:
+            parts.append(r"(?P<bracket>\[.*?\])")
+        if cfg.parenthesis:
+            parts.append(r"(?P<paren>[（(].*?[）)])")
+        if cfg.emotion_tag:
+            parts.append(r"(?P<emotion>&&.*?&&)")
+        if cfg.emoji:
+            parts.append(f"(?P<emoji>[{emoji_char_class()}]+)")
+        self._fused = re.compile("|".join(parts)) if parts else None
+        self._lead = [s for s in cfg.lead if s]
+        self._tail = [s for s in cfg.tail if s]
+        self._punct = re.compile(cfg.punctuation) if cfg.punctuation else None
+
+    @staticmethod
+    def _cut(
+        pattern: re.Pattern[str],
+        text: str,
+        removed: dict[str, list[str]] | None,
+        label,
+    ) -> str:
+        """一次扫描摘除 pattern 的所有匹配，并按 label(m) 记录被摘除的内容"""
+        pieces: list[str] = []
+        last = 0
+        for m in pattern.finditer(text):
+            start, end = m.span()
+            if start == end:
+                continue
+            pieces.append(text[last:start])
+            if removed is not None:
+                removed[label(m)].append(m.group())
+            last = end
+        if not last:
+            return text
+        pieces.append(text[last:])
+        return "".join(pieces)
+
+    def clean(self, text: str, removed: dict[str, list[str]] | None = None) -> str:
+        """清理文本；传入 removed 时按类别记录被摘除的内容"""
+        if self._fused is not None:
+            labels = self._LABELS
+            text = self._cut(self._fused, text, removed, lambda m: labels[m.lastgroup])
+
+        for s in self._lead:
+            if text.startswith(s):
+                if removed is not None:
+                    removed["前缀"].append(s)
+                text = text[len(s) :]
+                break
+
+        for s in self._tail:
+            if text.endswith(s):
+                if removed is not None:
+                    removed["后缀"].append(s)
+                text = text[: -len(s)]
+                break
+
+        if self._punct is not None:
+            text = self._cut(self._punct, text, removed, lambda m: "标点字符")
+        return text
+
+
 class CleanStep(BaseStep):
     name = StepName.CLEAN
 
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.clean
+        self.cleaner = TextCleaner(self.cfg)
 
     async def handle(self, ctx: OutContext) -> StepResult:
-        removed: dict[str, list[str]] = defaultdict(list)
+        # 被摘除的内容只用于日志，不输出调试日志时不收集
+        removed = defaultdict(list) if debug_enabled() else None
 
         for seg in ctx.chain:
             if not isinstance(seg, Plain):
@@ -27,58 +132,11 @@ class CleanStep(BaseStep):
             if len(seg.text) >= self.cfg.text_threshold:
                 continue
 
-            # 中括号
-            if self.cfg.bracket:
-                matches = re.findall(r"\[.*?\]", seg.text)
-                if matches:
-                    removed["中括号内容"].extend(matches)
-                    seg.text = re.sub(r"\[.*?\]", "", seg.text)
-
-            # 圆括号
-            if self.cfg.parenthesis:
-                matches = re.findall(r"[（(].*?[）)]", seg.text)
-                if matches:
-                    removed["圆括号内容"].extend(matches)
-                    seg.text = re.sub(r"[（(].*?[）)]", "", seg.text)
-
-            # 情绪标签
-            if self.cfg.emotion_tag:
-                matches = re.findall(r"&&.*?&&", seg.text)
-                if matches:
-                    removed["情绪标签"].extend(matches)
-                    seg.text = re.sub(r"&&.*?&&", "", seg.text)
-
-            # Emoji
-            if self.cfg.emoji:
-                emojis = [c for c in seg.text if c in emoji.EMOJI_DATA]
-                if emojis:
-                    removed["Emoji"].extend(emojis)
-                    seg.text = emoji.replace_emoji(seg.text, replace="")
-
-            # 前缀
-            if self.cfg.lead:
-                for s in self.cfg.lead:
-                    if seg.text.startswith(s):
-                        removed["前缀"].append(s)
-                        seg.text = seg.text[len(s) :]
-                        break
-
-            # 后缀
-            if self.cfg.tail:
-                for s in self.cfg.tail:
-                    if seg.text.endswith(s):
-                        removed["后缀"].append(s)
-                        seg.text = seg.text[: -len(s)]
-                        break
-
-            # 标点
-            if self.cfg.punctuation:
-                matches = re.findall(self.cfg.punctuation, seg.text)
-                if matches:
-                    removed["标点字符"].extend(matches)
-                    seg.text = re.sub(self.cfg.punctuation, "", seg.text)
-
-        return StepResult(msg=self._build_msg(removed))
+            seg.text = self.cleaner.clean(seg.text, removed)
+
+        if not removed:
+            return StepResult()
+        return StepResult(msg=lambda: self._build_msg(removed))
 
     def _build_msg(self, removed: dict[str, list[str]]) -> str:
         """消息构建（记录删了什么）"""
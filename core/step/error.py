@@ -1,5 +1,8 @@
 import asyncio
 import copy
+import re
+import time
+from dataclasses import dataclass
 
 from astrbot.api import logger
 from astrbot.core.message.components import Plain
@@ -11,19 +14,82 @@ from ..model import OutContext, StepName, StepResult
 from .base import BaseStep
 
 
+@dataclass(slots=True)
+class ErrorDigest:
+    """合并窗口内的一组相似报错"""
+
+    ctx: OutContext
+    """首条报错的上下文（用于构造转发会话）"""
+    text: str
+    """首条报错原文"""
+    count: int = 1
+    """窗口内累计次数"""
+    first_at: float = 0.0
+    """首条报错时间"""
+
+
 class ErrorStep(BaseStep):
     name = StepName.ERROR
 
+    _VOLATILE_RE = re.compile(r"[0-9a-fA-F]{8,}(?:-[0-9a-fA-F]{4,})*|\d+")
+    """报错中易变的部分（请求 ID / UUID、数字），归一化时抹去；长十六进制在前，
+    避免以数字开头的 ID 被拆成几段分别抹去"""
+
+    _DRAIN_TIMEOUT = 5.0
+    """终止时等待转发完成的最长秒数，超时后取消"""
+
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.error
         self.admins_id = config.admins_id
-
-    def _find_hit_keyword(self, text: str) -> str | None:
-        for word in self.cfg.keywords:
-            if word in text:
-                return word
-        return None
+        self._pending: dict[str, ErrorDigest] = {}
+        """报错指纹 -> 待转发的合并摘要"""
+        self._timers: set[asyncio.Task] = set()
+        """合并窗口计时任务"""
+        self._deliveries: set[asyncio.Task] = set()
+        """正在转发的任务"""
+
+    async def terminate(self):
+        """
+        取消窗口计时，立即转发尚未发出的摘要；
+        连同已在转发中的任务最多等待 _DRAIN_TIMEOUT 秒，仍未完成的再取消
+        """
+        for task in self._timers:
+            task.cancel()
+        await asyncio.gather(*self._timers, return_exceptions=True)
+        self._timers.clear()
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for digest in pending:
+            self._spawn(self._deliver(digest), self._deliveries)
+
+        if self._deliveries:
+            _, late = await asyncio.wait(self._deliveries, timeout=self._DRAIN_TIMEOUT)
+            for task in late:
+                task.cancel()
+            await asyncio.gather(*late, return_exceptions=True)
+            if late:
+                logger.warning(f"终止时仍有 {len(late)} 条报错未转发完成，已取消")
+        self._deliveries.clear()
+
+    def adopt(self, old: BaseStep):
+        """
+        接管合并中的报错与转发任务。旧实例的窗口计时会按旧配置转发，
+        因此取消后按新的合并窗口（从首条报错起算）在本实例上重新计时
+        """
+        if isinstance(old, ErrorStep):
+            self._pending = old._pending
+            self._deliveries = old._deliveries
+            for task in old._timers:
+                task.cancel()
+            old._timers.clear()
+            now = time.time()
+            for key, digest in self._pending.items():
+                left = self.cfg.coalesce_window - (now - digest.first_at)
+                self._spawn(self._flush_later(key, max(left, 0.0)), self._timers)
+
+    def _find_hit_keyword(self, ctx: OutContext) -> str | None:
+        return ctx.keyword_hit(self.plugin_config.keyword_engine, "error")
 
     def _build_session(self, ctx: OutContext, target_id: str):
         """
@@ -40,30 +106,92 @@ class ErrorStep(BaseStep):
             session.message_type = MessageType.FRIEND_MESSAGE
         return session
 
-    async def _forward_to_admin(self, ctx: OutContext) -> str:
+    # ================== 合并转发 ==================
+
+    def _fingerprint(self, text: str) -> str:
+        """相似报错（仅数字、请求 ID 等不同）得到相同指纹"""
+        return self._VOLATILE_RE.sub("#", text.strip())[:200]
+
+    def _spawn(self, coro, tasks: set[asyncio.Task]) -> None:
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def _collect(self, ctx: OutContext) -> None:
+        """把报错计入合并窗口；窗口内首条报错负责到期后统一转发"""
+        window = self.cfg.coalesce_window
+        digest = ErrorDigest(ctx, ctx.plain, first_at=time.time())
+        if window <= 0:
+            self._spawn(self._deliver(digest), self._deliveries)
+            return
+
+        key = self._fingerprint(ctx.plain)
+        if prev := self._pending.get(key):
+            prev.count += 1
+            return
+        self._pending[key] = digest
+        self._spawn(self._flush_later(key, window), self._timers)
+
+    async def _flush_later(self, key: str, window: float) -> None:
+        """窗口到期后转交转发任务（计时可随时取消，转发不受影响）"""
+        await asyncio.sleep(window)
+        digest = self._pending.pop(key, None)
+        if digest is not None:
+            self._spawn(self._deliver(digest), self._deliveries)
+
+    async def _deliver(self, digest: ErrorDigest) -> None:
+        text = digest.text
+        if digest.count > 1:
+            text = (
+                f"[{self.cfg.coalesce_window} 秒内同类报错 {digest.count} 次，"
+                f"首次于 {time.strftime('%H:%M:%S', time.localtime(digest.first_at))}]\n"
+                f"{text}"
+            )
+        feedback = await self._forward_to_admin(digest.ctx, text)
+        logger.debug(f"报错转发（{digest.count} 次合并）：{feedback}")
+
+    async def _send(self, target: str, session, chain: MessageChain) -> str | None:
+        """发送到单个会话（按会话来源限流），返回失败原因（成功返回 None）"""
+        try:
+            await asyncio.wait_for(
+                self.plugin_config.outbox.send_message(
+                    self.plugin_config.context, session, chain
+                ),
+                timeout=self.cfg.forward_timeout or None,
+            )
+            return None
+        except asyncio.TimeoutError:
+            logger.warning(f"转发给 {target} 超时")
+            return "超时"
+        except Exception as e:
+            logger.warning(f"转发给 {target} 失败：{e}")
+            return str(e)
+
+    async def _forward_to_admin(self, ctx: OutContext, text: str) -> str:
         """
-        转发消息给设定的会话
+        转发消息给设定的会话（多个管理员并发发送）
         返回反馈信息（字符串）
         """
-        chain = MessageChain([Plain(ctx.plain)])
-        context = self.plugin_config.context
+        chain = MessageChain([Plain(text)])
 
         if self.cfg.forward_umo == "admin":
             if not self.admins_id:
                 logger.warning("未配置管理员ID，无法转发报错信息")
                 return "未配置管理员ID，无法转发报错信息"
 
-            failed = []
-            for admin_id in self.admins_id:
-                try:
-                    session = self._build_session(ctx, admin_id)
-                    await context.send_message(session, chain)
-                except asyncio.CancelledError:
-                    raise
-                except Exception as e:
-                    logger.warning(f"转发给 admin {admin_id} 失败：{e}")
-                    failed.append(str(admin_id))
-
+            errors = await asyncio.gather(
+                *(
+                    self._send(
+                        str(admin_id), self._build_session(ctx, admin_id), chain
+                    )
+                    for admin_id in self.admins_id
+                )
+            )
+            failed = [
+                str(admin_id)
+                for admin_id, err in zip(self.admins_id, errors)
+                if err is not None
+            ]
             if failed:
                 return f"转发失败，失败 admin: {','.join(failed)}"
             return "转发成功"
@@ -72,38 +200,28 @@ class ErrorStep(BaseStep):
         forward_umo: str = self.cfg.forward_umo
         if forward_umo.startswith("g:"):
             # 群聊：直接用 session 发送
-            try:
-                session = self._build_session(ctx, forward_umo)
-                await context.send_message(session, chain)
-                return "转发成功"
-            except asyncio.CancelledError:
-                raise
-            except Exception as e:
-                logger.warning(f"转发给 {forward_umo} 失败：{e}")
-                return f"转发失败：{e}"
+            err = await self._send(
+                forward_umo, self._build_session(ctx, forward_umo), chain
+            )
         else:
             # 原有逻辑：直接传 umo 字符串（私聊 unified_msg_origin）
-            try:
-                await context.send_message(forward_umo, chain)
-                return "转发成功"
-            except asyncio.CancelledError:
-                raise
-            except Exception as e:
-                logger.warning(f"转发给 {forward_umo} 失败：{e}")
-                return f"转发失败：{e}"
+            err = await self._send(forward_umo, forward_umo, chain)
+        return f"转发失败：{err}" if err else "转发成功"
+
+    # ================== 主入口 ==================
 
     async def handle(self, ctx: OutContext) -> StepResult:
-        hit_word = self._find_hit_keyword(ctx.plain)
+        hit_word = self._find_hit_keyword(ctx)
         if not hit_word:
             return StepResult()
 
         msg = f"命中报错关键词 {hit_word}"
 
         if self.cfg.forward_umo:
-            forward_msg = await self._forward_to_admin(ctx)
-            msg += f"，{forward_msg}"
+            self._collect(ctx)
+            msg += "，已转交后台合并转发"
 
         ctx.event.set_result(ctx.event.plain_result(self.cfg.custom_msg))
         msg += f"，原消息替换为 {self.cfg.custom_msg}"
 
-        return StepResult(msg=msg)
\ No newline at end of file
+        return StepResult(msg=msg)
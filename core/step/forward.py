@@ -15,6 +15,7 @@ from .base import BaseStep
 
 class ForwardStep(BaseStep):
     name = StepName.FORWARD
+    platforms = frozenset({"aiocqhttp"})
 
     def __init__(self, config: PluginConfig):
         super().__init__(config)
@@ -33,16 +34,19 @@ class ForwardStep(BaseStep):
             self.node_name = "AstrBot"
         return self.node_name
 
-    async def handle(self, ctx: OutContext) -> StepResult:
-        if (
-            not isinstance(ctx.event, AiocqhttpMessageEvent)
-            or not isinstance(ctx.chain[-1], Plain)
-            or len(ctx.chain[-1].text) <= self.cfg.threshold
-        ):
-            return StepResult()
+    def prefetch(self, ctx: OutContext):
+        """节点名未知且消息可能需要转发时，提前拉取登录信息"""
+        if self.node_name or len(ctx.plain) <= self.cfg.threshold:
+            return None
+        return self._ensure_node_name(ctx.event)
+
+    def accepts(self, ctx: OutContext) -> bool:
+        last = ctx.chain[-1]
+        return isinstance(last, Plain) and len(last.text) > self.cfg.threshold
 
+    async def handle(self, ctx: OutContext) -> StepResult:
         nodes = Nodes([])
-        name = await self._ensure_node_name(ctx.event)
+        name = await self.prefetched(ctx) or await self._ensure_node_name(ctx.event)
         content = list(ctx.chain.copy())
         nodes.nodes.append(Node(uin=ctx.bid, name=name, content=content))
         ctx.chain[:] = [nodes]
@@ -1,4 +1,5 @@
 import asyncio
+from typing import cast
 
 from aiocqhttp import CQHttp
 
@@ -6,7 +7,6 @@ from astrbot.api import logger
 from astrbot.core.message.components import (
     At,
     AtAll,
-    BaseMessageComponent,
     Face,
     Forward,
     Image,
@@ -27,6 +27,7 @@ from .base import BaseStep
 
 class RecallStep(BaseStep):
     name = StepName.RECALL
+    platforms = frozenset({"aiocqhttp"})
 
     def __init__(self, config: PluginConfig):
         super().__init__(config)
@@ -43,20 +44,28 @@ class RecallStep(BaseStep):
         await asyncio.gather(*self.recall_tasks, return_exceptions=True)
         self.recall_tasks.clear()
 
+    def adopt(self, old: BaseStep):
+        """接管尚未执行的撤回任务"""
+        if isinstance(old, RecallStep):
+            for task in old.recall_tasks:
+                task.add_done_callback(self._remove_task)
+                self.recall_tasks.append(task)
+            old.recall_tasks.clear()
+
     def _remove_task(self, task: asyncio.Task):
         try:
             self.recall_tasks.remove(task)
         except ValueError:
             pass
 
-    def _is_recall(self, chain: list[BaseMessageComponent]) -> bool:
-        """判断消息是否需撤回，并返回原因"""
-        for seg in chain:
-            if isinstance(seg, Plain):
-                for word in self.cfg.keywords:
-                    if word in seg.text:
-                        logger.debug(f"包含敏感关键词：{word}")
-                        return True
+    def _is_recall(self, ctx: OutContext) -> bool:
+        """判断回复原文是否含撤回关键词（只匹配撤回词表，与其他步骤共用命中缓存）"""
+        if not self.cfg.keywords:
+            return False
+        word = ctx.keyword_hit(self.plugin_config.keyword_engine, "recall")
+        if word:
+            logger.debug(f"包含敏感关键词：{word}")
+            return True
         return False
 
     async def _recall_msg(self, client: CQHttp, message_id: int):
@@ -68,42 +77,42 @@ class RecallStep(BaseStep):
         except Exception as e:
             logger.error(f"撤回消息失败: {e}")
 
-    async def handle(self, ctx: OutContext) -> StepResult:
-        """对外接口：发消息并撤回"""
-        if isinstance(ctx.event, AiocqhttpMessageEvent) and any(
+    def accepts(self, ctx: OutContext) -> bool:
+        return any(
             isinstance(
                 seg,
                 Plain | Image | Video | Face | At | AtAll | Forward | Reply | Nodes,
             )
             for seg in ctx.chain
-        ):
-            if self._is_recall(ctx.chain):
-                ctx.event.should_call_llm(True)
-                obmsg = await ctx.event._parse_onebot_json(
-                    MessageChain(chain=ctx.chain)
-                )
-                client = ctx.event.bot
-
-                send_result = None
-                if ctx.gid:
-                    send_result = await client.send_group_msg(
-                        group_id=int(ctx.gid), message=obmsg
-                    )
-                elif ctx.uid:
-                    send_result = await client.send_private_msg(
-                        user_id=int(ctx.uid), message=obmsg
-                    )
-
-                if send_result and (message_id := send_result.get("message_id")):
-                    task = asyncio.create_task(
-                        self._recall_msg(client, int(message_id))
-                    )
-                    task.add_done_callback(self._remove_task)
-                    self.recall_tasks.append(task)
-
-                ctx.chain.clear()
-                return StepResult(
-                    msg=f"已启动撤回任务，将在 {self.cfg.delay} 秒后撤回消息"
-                )
-
-        return StepResult()
+        )
+
+    async def handle(self, ctx: OutContext) -> StepResult:
+        """对外接口：发消息并撤回"""
+        if not self._is_recall(ctx):
+            return StepResult()
+
+        event = cast(AiocqhttpMessageEvent, ctx.event)
+        event.should_call_llm(True)
+        obmsg = await event._parse_onebot_json(MessageChain(chain=ctx.chain))
+        client = event.bot
+        outbox = self.plugin_config.outbox
+
+        send_result = None
+        if ctx.gid:
+            send_result = await outbox.send(
+                event.unified_msg_origin,
+                lambda: client.send_group_msg(group_id=int(ctx.gid), message=obmsg),
+            )
+        elif ctx.uid:
+            send_result = await outbox.send(
+                event.unified_msg_origin,
+                lambda: client.send_private_msg(user_id=int(ctx.uid), message=obmsg),
+            )
+
+        if send_result and (message_id := send_result.get("message_id")):
+            task = asyncio.create_task(self._recall_msg(client, int(message_id)))
+            task.add_done_callback(self._remove_task)
+            self.recall_tasks.append(task)
+
+        ctx.chain.clear()
+        return StepResult(msg=f"已启动撤回任务，将在 {self.cfg.delay} 秒后撤回消息")
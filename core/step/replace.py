@@ -1,3 +1,6 @@
+import re
+from typing import Any
+
 from astrbot.core.message.components import Plain
 
 from ..config import PluginConfig
@@ -11,42 +14,43 @@ class ReplaceStep(BaseStep):
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.replace
+        self.hits: dict[str, int] = {}
+        """旧词 -> 累计替换次数"""
 
-    def _unescape(self, s: str) -> str:
-        """
-        简单转义处理：将 \\n, \\r, \\t, \\s 等转换为实际字符
-        """
-        return (
-            s.replace("\\n", "\n")  # 换行符
-            .replace("\\r", "\r")  # 回车符
-            .replace("\\t", "\t")  # 制表符
-            .replace("\\s", " ")  # 空格
-            .replace("\\\\", "\\")  # 反斜杠本身（放最后）
-        )
+    def stats(self) -> dict[str, Any] | None:
+        if not self.hits:
+            return None
+        return {
+            "replaced": sum(self.hits.values()),
+            "hits": dict(sorted(self.hits.items(), key=lambda kv: -kv[1])),
+        }
 
     async def handle(self, ctx: OutContext) -> StepResult:
-        changes: list[tuple[str, str]] = []
-
-        for seg in ctx.chain:
-            if isinstance(seg, Plain):
-                for word in self.cfg.words:
-                    if not word.strip():
-                        continue
+        pattern = self.cfg.pattern
+        if pattern is None:
+            return StepResult()
 
-                    raw_old, sep, raw_new = word.partition(" ")
-                    old = self._unescape(raw_old)
+        table = self.cfg.table
+        changes: dict[str, int] = {}
 
-                    if not sep:
-                        new = self.cfg.default_new_word * len(old)
-                    else:
-                        new = self._unescape(raw_new)
+        def _sub(m: re.Match[str]) -> str:
+            old = m.group()
+            changes[old] = changes.get(old, 0) + 1
+            return table[old]
 
-                    if old in seg.text:
-                        seg.text = seg.text.replace(old, new)
-                        changes.append((repr(old), repr(new)))
+        for seg in ctx.chain:
+            if isinstance(seg, Plain) and seg.text:
+                seg.text = pattern.sub(_sub, seg.text)
 
         if changes:
-            msg = "已替换：\n" + "\n".join(f"{old} -> {new}" for old, new in changes)
-            return StepResult(msg=msg)
+            hits = self.hits
+            for old, n in changes.items():
+                hits[old] = hits.get(old, 0) + n
+            return StepResult(
+                msg=lambda: "已替换：\n"
+                + "\n".join(
+                    f"{old!r} -> {table[old]!r} ×{n}" for old, n in changes.items()
+                )
+            )
 
         return StepResult()
@@ -1,6 +1,8 @@
 import asyncio
+import contextlib
 import random
 import re
+from collections import deque
 from dataclasses import dataclass, field
 
 from astrbot.api import logger
@@ -49,21 +51,106 @@ class Segment:
 
 class SplitStep(BaseStep):
     name = StepName.SPLIT
+    platforms = frozenset({"aiocqhttp", "telegram", "lark"})
+
+    _QUEUE_LIMIT = 64
+    """单个会话最多排队的分段数（不低于 max_count），超出的分段丢弃"""
+    _DRAIN_TIMEOUT = 5.0
+    """终止时等待排队分段发完的最长秒数，超时后取消"""
 
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.split
         self.context = config.context
-
+        self.outbox = config.outbox
+        self._outbox: dict[str, deque[tuple[list[BaseMessageComponent], float]]] = {}
+        """会话 -> 待发送的 (分段, 发送后延迟)"""
+        self._senders: dict[str, asyncio.Task] = {}
+        """会话 -> 后台发送任务"""
+        self._closing = asyncio.Event()
+        """置位后不再做段间延迟，尽快发完排队的分段"""
+
+    async def terminate(self):
+        """
+        停止段间延迟，尽快发出排队中的分段；
+        最多等待 _DRAIN_TIMEOUT 秒，仍未发完的会话再取消（剩余分段丢弃）
+        """
+        self._closing.set()
+        tasks = list(self._senders.values())
+        if tasks:
+            _, late = await asyncio.wait(tasks, timeout=self._DRAIN_TIMEOUT)
+            dropped = sum(len(queue) for queue in self._outbox.values())
+            for task in late:
+                task.cancel()
+            await asyncio.gather(*late, return_exceptions=True)
+            if late:
+                logger.warning(f"[Splitter] 终止时仍有 {dropped} 个分段未发出，已丢弃")
+        self._senders.clear()
+        self._outbox.clear()
+
+    def adopt(self, old: BaseStep):
+        """接管正在发送的会话，保证热重载前后同一会话的消息不交错"""
+        if isinstance(old, SplitStep):
+            self._outbox = old._outbox
+            self._senders = old._senders
+            self._closing = old._closing
+
+    # -------------------------
+    # 后台发送
+    # -------------------------
+    def _enqueue(
+        self, umo: str, items: list[tuple[list[BaseMessageComponent], float]]
+    ) -> None:
+        """
+        按会话排队发送；同一会话的后一条回复排在前一条之后，不会交错
+        """
+        queue = self._outbox.get(umo)
+        if queue is None:
+            queue = self._outbox[umo] = deque()
+        # 上限不低于 max_count，保证空闲会话总能容下一整条回复
+        limit = max(self._QUEUE_LIMIT, self.cfg.max_count)
+        room = limit - len(queue)
+        if len(items) > room:
+            logger.warning(
+                f"[Splitter] 会话 {umo} 排队分段已达上限 {limit}，"
+                f"丢弃 {len(items) - max(room, 0)} 个分段"
+            )
+            items = items[: max(room, 0)]
+        queue.extend(items)
+        if umo not in self._senders:
+            self._senders[umo] = asyncio.create_task(self._drain(umo, queue))
+
+    async def _drain(
+        self, umo: str, queue: deque[tuple[list[BaseMessageComponent], float]]
+    ) -> None:
+        try:
+            while queue:
+                comps, delay = queue.popleft()
+                try:
+                    await self.outbox.send_message(
+                        self.context, umo, MessageChain(comps)
+                    )
+                except Exception as e:
+                    logger.error(f"[Splitter] 发送分段失败: {e}")
+                if delay > 0 and not self._closing.is_set():
+                    # 终止时提前醒来，不再等完延迟
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._closing.wait(), delay)
+        finally:
+            # 队列取空与清理之间没有 await，入队方不会落在两者之间
+            self._senders.pop(umo, None)
+            self._outbox.pop(umo, None)
+
+    # -------------------------
+    # 主入口
+    # -------------------------
     async def handle(self, ctx: OutContext) -> StepResult:
         """
-        对消息进行拆分并发送。
-        最后一段会回填到原 chain 中。
+        对消息进行拆分，交给会话的后台发送队列后立即返回。
+        各段（含最后一段）按序在后台发送，段间按打字速度延迟。
         """
-        platform_name = ctx.event.get_platform_name()
-        if platform_name not in {"aiocqhttp", "telegram", "lark"}:
-            return StepResult()
-
+        umo = ctx.event.unified_msg_origin
+        busy = umo in self._senders
         segments = self._split_chain(ctx.chain)
 
         # 后处理
@@ -77,36 +164,26 @@ class SplitStep(BaseStep):
                     break
 
         if len(segments) <= 1:
-            return StepResult()
-
-        logger.debug(f"[Splitter] 消息被分为 {len(segments)} 段")
-
-        # 逐段发送（最后一段不立即发）
-        for i in range(len(segments) - 1):
-            seg = segments[i]
-
+            if not busy:
+                return StepResult()
+            # 该会话仍有分段在发送，整条消息排到其后，避免插队
+            self._enqueue(umo, [(list(ctx.chain), 0.0)])
+            ctx.chain.clear()
+            return StepResult(msg="会话仍在分段发送中，消息已排队")
+
+        items: list[tuple[list[BaseMessageComponent], float]] = []
+        for i, seg in enumerate(segments):
             if seg.is_empty:
                 continue
+            last = i == len(segments) - 1
+            delay = 0.0 if last else self._calc_delay(seg.text)
+            items.append((self._wrap_plain_with_zwsp(seg.components), delay))
 
-            try:
-                send_comps = self._wrap_plain_with_zwsp(seg.components)
-                await self.plugin_config.context.send_message(
-                    ctx.event.unified_msg_origin,
-                    MessageChain(send_comps),
-                )
-                delay = self._calc_delay(seg.text)
-                await asyncio.sleep(delay)
-            except Exception as e:
-                logger.error(f"[Splitter] 发送分段 {i + 1} 失败: {e}")
-
-        # 最后一段回填给主流程继续处理
+        self._enqueue(umo, items)
         ctx.chain.clear()
-        if not segments[-1].is_empty:
-            last_seg = segments[-1]
-            last_comps = self._wrap_plain_with_zwsp(last_seg.components)
-            ctx.chain.extend(last_comps)
-
-        return StepResult(msg="分段回复完成")
+        return StepResult(
+            msg=lambda: f"消息被分为 {len(segments)} 段，已交给后台按序发送"
+        )
 
 
     def _calc_delay(self, text: str) -> float:
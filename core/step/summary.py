@@ -1,6 +1,8 @@
+import asyncio
 import json
 import random
 from pathlib import Path
+from typing import cast
 
 from astrbot.api import logger
 from astrbot.core.message.components import Image
@@ -16,11 +18,16 @@ from .base import BaseStep
 
 class SummaryStep(BaseStep):
     name = StepName.SUMMARY
+    platforms = frozenset({"aiocqhttp"})
 
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.summary
-        self.quotes = self._load_all_quotes()
+        self.quotes: list[str] = list(self.cfg.quotes)
+
+    async def initialize(self):
+        if self.cfg.quotes_files:
+            self.quotes = await asyncio.to_thread(self._load_all_quotes)
 
     def _load_all_quotes(self) -> list[str]:
         """
@@ -44,21 +51,21 @@ class SummaryStep(BaseStep):
                 logger.warning("读取金句文件失败 %s: %s", path, e)
         return quotes
 
+    def accepts(self, ctx: OutContext) -> bool:
+        return len(ctx.chain) == 1 and isinstance(ctx.chain[0], Image)
+
     async def handle(self, ctx: OutContext) -> StepResult:
         """图片外显（直接发送并中断流水线）"""
-        if (
-            isinstance(ctx.event, AiocqhttpMessageEvent)
-            and len(ctx.chain) == 1
-            and isinstance(ctx.chain[0], Image)
-        ):
-            obmsg = await ctx.event._parse_onebot_json(MessageChain(ctx.chain))
-            quote = random.choice(self.quotes)
-            obmsg[0]["data"]["summary"] = quote
-
-            await ctx.event.bot.send(ctx.event.message_obj.raw_message, obmsg)  # type: ignore
-            ctx.event.should_call_llm(True)
-            ctx.chain.clear()
+        event = cast(AiocqhttpMessageEvent, ctx.event)
+        obmsg = await event._parse_onebot_json(MessageChain(ctx.chain))
+        quote = random.choice(self.quotes)
+        obmsg[0]["data"]["summary"] = quote
 
-            return StepResult(abort=True, msg=f"已给图片附加外显金句：{quote}")
+        await self.plugin_config.outbox.send(
+            event.unified_msg_origin,
+            lambda: event.bot.send(event.message_obj.raw_message, obmsg),  # type: ignore
+        )
+        event.should_call_llm(True)
+        ctx.chain.clear()
 
-        return StepResult()
+        return StepResult(abort=True, msg=f"已给图片附加外显金句：{quote}")
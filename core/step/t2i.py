@@ -1,11 +1,18 @@
+import asyncio
 import shutil
+import time
+from hashlib import blake2b
 from pathlib import Path
+from typing import Any, cast
 
 from astrbot import logger
+from astrbot.api.event import MessageChain
 from astrbot.core.message.components import Image, Plain
 
+from ..cache import FileCache
 from ..config import PluginConfig
 from ..model import OutContext, StepName, StepResult
+from ..render import Encoding, Rendered, RenderPool, paginate
 from .base import BaseStep
 
 
@@ -16,41 +23,178 @@ class T2IStep(BaseStep):
         super().__init__(config)
         self.cfg = config.t2i
         self.image_cache_dir = config.data_dir / "image_cache"
-        self.image_cache_dir.mkdir(parents=True, exist_ok=True)
-        self.style = None
+        self.renderer = RenderPool(
+            self.cfg.pillowmd_style_dir,
+            mode=self.cfg.render_mode,
+            workers=self.cfg.render_workers,
+        )
+        self.encoding = Encoding(
+            format=self.cfg.image_format
+            if self.cfg.image_format in Encoding.FORMATS
+            else "png",
+            quality=min(max(self.cfg.image_quality, 1), 100),
+            max_width=max(self.cfg.max_width, 0),
+            colors=max(self.cfg.palette_colors, 0),
+        )
+        self._warming: asyncio.Task | None = None
+        self.cache: FileCache | None = None
+        if self.cfg.cache_budget > 0:
+            self.cache = FileCache(
+                self.image_cache_dir,
+                budget=self.cfg.cache_budget * 1024 * 1024,
+                ttl=self.cfg.cache_ttl,
+            )
 
-    async def _load_style(self):
-        try:
-            import pillowmd
+    async def initialize(self):
+        await asyncio.to_thread(self.image_cache_dir.mkdir, parents=True, exist_ok=True)
+        if self.cache is not None and not len(self.cache):
+            try:
+                await asyncio.to_thread(self.cache.scan)
+            except Exception as e:
+                logger.warning(f"扫描图片缓存失败: {e}")
+        if not self.renderer.warmed:
+            # 后台预加载样式与字体，不阻塞启动，也不让首条长文等待加载
+            self._warming = asyncio.create_task(self._warm())
 
-            style_path = Path(self.cfg.pillowmd_style_dir).resolve()
-            self.style = pillowmd.LoadMarkdownStyles(style_path)
-            return self.style
+    async def _warm(self):
+        try:
+            cost = await self.renderer.warm()
+            logger.debug(f"pillowmd 样式已预加载，耗时 {cost * 1000:.1f}ms")
         except Exception as e:
             logger.error(f"加载 pillowmd 失败: {e}")
 
+    def adopt(self, old: BaseStep):
+        """样式与池配置未变时沿用渲染池（worker 中已加载样式）；沿用渲染缓存索引并应用新的上限"""
+        if not isinstance(old, T2IStep):
+            return
+        if old.renderer.same(self.renderer):
+            self.renderer = old.renderer
+        else:
+            old.renderer.close_nowait()
+        if self.cache is not None and old.cache is not None:
+            old.cache.budget = self.cache.budget
+            old.cache.ttl = self.cache.ttl
+            self.cache = old.cache
+
+    def stats(self) -> dict[str, Any] | None:
+        stats = self.renderer.stats()
+        if self.cache is not None:
+            stats.update(self.cache.stats())
+        return stats
+
+    def _cache_key(self, text: str) -> str:
+        """(文本, 样式, 分页, 编码) 的内容摘要"""
+        h = blake2b(digest_size=16)
+        h.update(self.renderer.style_dir.encode())
+        h.update(b"\0page" if self.cfg.auto_page else b"\0single")
+        if not self.encoding.default:
+            h.update(repr(self.encoding).encode())
+        h.update(b"\0")
+        h.update(text.encode())
+        return h.hexdigest()
+
+    def accepts(self, ctx: OutContext) -> bool:
+        last = ctx.chain[-1]
+        return isinstance(last, Plain) and len(last.text) > self.cfg.threshold
+
+    async def _render(self, text: str) -> tuple[Path, Rendered | None]:
+        """渲染一段文本（或取缓存），返回 (图片路径, 渲染结果)，缓存命中时渲染结果为 None"""
+        cache = self.cache
+        key = self._cache_key(text) if cache is not None else ""
+        path = cache.get(key) if cache is not None else None
+        if path is not None:
+            return path, None
+
+        out = await self.renderer.render(
+            text,
+            self.cfg.auto_page,
+            self.image_cache_dir,
+            name=key,
+            enc=self.encoding,
+        )
+        if cache is not None:
+            cache.put(key, out.path, out.size)
+            await cache.purge()
+        return out.path, out
+
     async def handle(self, ctx: OutContext) -> StepResult:
-        if (
-            isinstance(ctx.chain[-1], Plain)
-            and len(ctx.chain[-1].text) > self.cfg.threshold
-        ):
-            style = self.style or await self._load_style()
-            if style:
-                text = ctx.chain[-1].text
-                img = await style.AioRender(
-                    text=text,
-                    useImageUrl=True,
-                    autoPage=self.cfg.auto_page,
-                )
-                path = img.Save(self.image_cache_dir)
-                ctx.chain[-1] = Image.fromFileSystem(str(path))
-                return StepResult(msg=f"已将文本消息({text[:10]})转化为图片消息")
-        return StepResult()
+        text = cast(Plain, ctx.chain[-1]).text
+        pages = paginate(text, self.cfg.page_chars)
+        if len(pages) > 1:
+            return await self._handle_pages(ctx, text, pages)
+
+        try:
+            path, out = await self._render(text)
+        except Exception as e:
+            logger.error(f"pillowmd 渲染失败: {e}")
+            return StepResult()
+        ctx.chain[-1] = Image.fromFileSystem(str(path))
+        if out is None:
+            return StepResult(msg=lambda: f"已将文本消息({text[:10]})转化为图片消息(缓存)")
+        return StepResult(msg=lambda: self._describe(text, out))
+
+    async def _handle_pages(
+        self, ctx: OutContext, text: str, pages: list[str]
+    ) -> StepResult:
+        """
+        分页模式：各页同时提交渲染（渲染池按提交顺序放行），按页序逐页发送，
+        最后一页放回消息链。首页连同消息链中的前置组件（如 @）一起发送。
+        某页渲染或发送失败时，该页及之后的内容以文本形式放回消息链
+        """
+        start = time.perf_counter()
+        umo = ctx.event.unified_msg_origin
+        prefix = ctx.chain[:-1]
+        tasks = [asyncio.create_task(self._render(page)) for page in pages]
+        first_ms = 0.0
+        sent = 0
+        try:
+            for i, task in enumerate(tasks):
+                head = prefix if not sent else []
+                try:
+                    path, _ = await task
+                    comps = [*head, Image.fromFileSystem(str(path))]
+                    if i == len(tasks) - 1:
+                        ctx.chain[:] = comps
+                        break
+                    await self.plugin_config.outbox.send_message(
+                        self.plugin_config.context, umo, MessageChain(comps)
+                    )
+                except Exception as e:
+                    logger.error(f"第 {i + 1} 页转图片失败，余下内容按文本发送: {e}")
+                    ctx.chain[:] = [*head, Plain("\n\n".join(pages[i:]))]
+                    break
+                if not sent:
+                    first_ms = (time.perf_counter() - start) * 1000
+                sent += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return StepResult(
+            msg=lambda: f"已将文本消息({text[:10]})分 {len(pages)} 页转化为图片消息，"
+            f"先行发送 {sent} 页，首页耗时 {first_ms:.0f}ms"
+        )
+
+    @staticmethod
+    def _describe(text: str, out: Rendered) -> str:
+        size = f"{out.path.suffix[1:]} {out.size // 1024}KB"
+        if out.original:
+            saved = out.saved * 100 // out.original
+            size += f"，较默认 PNG 节省 {out.saved // 1024}KB({saved}%)"
+        return f"已将文本消息({text[:10]})转化为图片消息（{size}）"
 
     async def terminate(self):
-        if self.cfg.clean_cache and self.image_cache_dir.exists():
+        if self._warming is not None:
+            self._warming.cancel()
+        await self.renderer.close()
+        if self.cfg.clean_cache:
             try:
-                shutil.rmtree(self.image_cache_dir)
+                await asyncio.to_thread(self._clean_dir, self.image_cache_dir)
             except Exception as e:
                 logger.error(f"清理缓存失败: {e}")
-            self.image_cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _clean_dir(path: Path) -> None:
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True, exist_ok=True)
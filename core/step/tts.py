@@ -1,5 +1,12 @@
-import re
+import asyncio
 import random
+import re
+import time
+import unicodedata
+from hashlib import blake2b
+from pathlib import Path
+from typing import Any, cast
+from urllib.parse import urlparse
 
 from astrbot.api import logger
 from astrbot.core.message.components import Plain, Record
@@ -7,7 +14,9 @@ from astrbot.core.platform.sources.aiocqhttp.aiocqhttp_message_event import (
     AiocqhttpMessageEvent,
 )
 
+from ..cache import FileCache, TTLCache
 from ..config import PluginConfig
+from ..metrics import LatencyHistogram
 from ..model import OutContext, StepName, StepResult
 from .base import BaseStep
 
@@ -18,13 +27,203 @@ _VOICE_TAG_RE = re.compile(r"<voice\s*/?>")
 _NON_STICKER_TAG_RE = re.compile(r"<(?!sticker[\s/>])[^>]+>")
 
 
+def _normalize(text: str) -> str:
+    """缓存键用的文本归一化：全半角统一（NFKC），空白折叠"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
 class TTSStep(BaseStep):
     name = StepName.TTS
+    platforms = frozenset({"aiocqhttp"})
 
     def __init__(self, config: PluginConfig):
         super().__init__(config)
         self.cfg = config.tts
         self.style = None
+        self.audio_dir = config.data_dir / "tts_cache"
+        self.urls: TTLCache[str] | None = None
+        """内存缓存：键 -> 语音 URL"""
+        self.files: FileCache | None = None
+        """磁盘缓存：下载到 audio_dir 的语音文件，重启后仍可命中"""
+        if self.cfg.disk_cache_budget > 0:
+            self.files = FileCache(
+                self.audio_dir,
+                budget=self.cfg.disk_cache_budget * 1024 * 1024,
+                ttl=self.cfg.cache_ttl,
+            )
+        elif self.cfg.cache_size > 0:
+            self.urls = TTLCache(self.cfg.cache_size, self.cfg.cache_ttl)
+        self.latency = LatencyHistogram()
+        """get_ai_record 调用耗时"""
+        self.synthesized = 0
+        self.deduped = 0
+        """合并到进行中的相同请求的次数"""
+        self.timeouts = 0
+        self.fallbacks = 0
+        """超时或出错后改发文本的次数"""
+        self._inflight: dict[str, asyncio.Task[str]] = {}
+        """键 -> 进行中的合成请求（相同文本只请求一次）"""
+        self._slots = (
+            asyncio.Semaphore(self.cfg.max_concurrency)
+            if self.cfg.max_concurrency > 0
+            else None
+        )
+        self._tasks: set[asyncio.Task] = set()
+        """后台任务（语音下载 / 预热）"""
+        self._warmed = False
+
+    async def initialize(self):
+        if self.files is not None and not len(self.files):
+            try:
+                await asyncio.to_thread(self.audio_dir.mkdir, parents=True, exist_ok=True)
+                await asyncio.to_thread(self.files.scan)
+            except Exception as e:
+                logger.warning(f"扫描语音缓存失败: {e}")
+
+    def adopt(self, old: BaseStep):
+        """沿用已缓存的语音（键含角色，换角色不会误命中）并应用新的上限"""
+        if not isinstance(old, TTSStep):
+            return
+        self._tasks = old._tasks
+        self._inflight = old._inflight
+        self._warmed = old._warmed and old.cfg.warmup == self.cfg.warmup
+        if self.urls is not None and old.urls is not None:
+            old.urls.ttl = self.urls.ttl
+            old.urls.resize(self.urls.capacity)
+            self.urls = old.urls
+        if self.files is not None and old.files is not None:
+            old.files.budget = self.files.budget
+            old.files.ttl = self.files.ttl
+            self.files = old.files
+
+    async def terminate(self):
+        tasks = [*self._tasks, *self._inflight.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any] | None:
+        cache = self.files if self.files is not None else self.urls
+        stats: dict[str, Any] = {
+            "synthesized": self.synthesized,
+            "inflight": len(self._inflight),
+            "deduped": self.deduped,
+            "timeouts": self.timeouts,
+            "fallbacks": self.fallbacks,
+            "synth_p50_ms": round(self.latency.percentile(0.50) * 1000, 3),
+            "synth_p95_ms": round(self.latency.percentile(0.95) * 1000, 3),
+        }
+        if cache is not None:
+            stats.update(cache.stats())
+        return stats
+
+    # -------------------------
+    # 合成与缓存
+    # -------------------------
+
+    def _cache_key(self, text: str) -> str:
+        h = blake2b(digest_size=16)
+        h.update(self.cfg.character_id.encode())
+        h.update(b"\0")
+        h.update(_normalize(text).encode())
+        return h.hexdigest()
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _synthesize(
+        self, bot, text: str, timeout: float = 0
+    ) -> tuple[Record, bool]:
+        """
+        合成语音（优先取缓存），返回 (语音组件, 是否命中缓存)。
+        相同文本的并发请求合并为一次；超过 timeout 秒（0 表示不限）抛出 TimeoutError，
+        此时请求本身继续进行，完成后照常写入缓存
+        """
+        key = self._cache_key(text)
+        if self.files is not None and (path := self.files.get(key)) is not None:
+            return Record.fromFileSystem(str(path)), True
+        if self.urls is not None and (url := self.urls.get(key)) is not None:
+            return Record.fromURL(url), True
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(
+                self._request(bot, key, text)
+            )
+            task.add_done_callback(lambda t: self._settle(key, t))
+        else:
+            self.deduped += 1
+        # shield：单个等待方超时或被取消不影响共享的请求
+        url = await asyncio.wait_for(asyncio.shield(task), timeout or None)
+        return Record.fromURL(url), False
+
+    def _settle(self, key: str, task: asyncio.Task[str]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 等待方可能都已超时离开，这里取走异常，避免 "exception was never retrieved"
+        if not task.cancelled() and (e := task.exception()) is not None:
+            logger.debug(f"TTS: 语音合成失败: {e}")
+
+    async def _request(self, bot, key: str, text: str) -> str:
+        """受并发上限约束地调用 get_ai_record，结果写入缓存"""
+        slots = self._slots
+        if slots is not None:
+            await slots.acquire()
+        try:
+            start = time.perf_counter()
+            url = await bot.get_ai_record(
+                character=self.cfg.character_id,
+                group_id=int(self.cfg.group_id),
+                text=text,
+            )
+            self.latency.observe(time.perf_counter() - start)
+        finally:
+            if slots is not None:
+                slots.release()
+        self.synthesized += 1
+        if self.urls is not None:
+            self.urls.put(key, url)
+        if self.files is not None:
+            # 本次直接发 URL，下载入库在后台进行，不增加回复延迟
+            self._spawn(self._download(key, url))
+        return url
+
+    async def _download(self, key: str, url: str) -> None:
+        files = self.files
+        if files is None or not url.startswith(("http://", "https://")):
+            return
+        try:
+            import aiohttp
+
+            timeout = aiohttp.ClientTimeout(total=30)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    data = await resp.read()
+            path = self.audio_dir / f"{key}{Path(urlparse(url).path).suffix or '.silk'}"
+            await asyncio.to_thread(path.write_bytes, data)
+        except Exception as e:
+            logger.warning(f"TTS: 缓存语音文件失败: {e}")
+            return
+        files.put(key, path, len(data))
+        await files.purge()
+
+    async def _warmup(self, bot) -> None:
+        """预先合成常用语句，填充缓存"""
+        done = 0
+        for phrase in self.cfg.warmup:
+            text = _XML_TAG_RE.sub("", phrase).strip()
+            if not text:
+                continue
+            try:
+                _, cached = await self._synthesize(bot, text)
+            except Exception as e:
+                logger.warning(f"TTS: 预热语句合成失败({text[:10]}): {e}")
+                continue
+            done += not cached
+        logger.debug(f"TTS: 预热完成，新合成 {done} 条")
 
     def _should_convert(self, text: str) -> tuple[bool, str]:
         """判断是否应该转语音，返回 (是否转换, 清理后的文本)"""
@@ -37,41 +236,55 @@ class TTSStep(BaseStep):
             return True, text
         return False, text
 
+    def accepts(self, ctx: OutContext) -> bool:
+        return len(ctx.chain) == 1 and isinstance(ctx.chain[0], Plain)
+
     async def handle(self, ctx: OutContext) -> StepResult:
-        if (
-            isinstance(ctx.event, AiocqhttpMessageEvent)
-            and len(ctx.chain) == 1
-            and isinstance(ctx.chain[0], Plain)
-            and len(ctx.chain[0].text) < self.cfg.threshold
-        ):  
-            should_convert, cleaned_text = self._should_convert(ctx.chain[0].text)
+        event = cast(AiocqhttpMessageEvent, ctx.event)
+        seg = cast(Plain, ctx.chain[0])
+        if not self._warmed:
+            # 预热需要 OneBot 客户端，在首条经过的消息时于后台进行
+            self._warmed = True
+            if self.cfg.warmup and (self.urls is not None or self.files is not None):
+                self._spawn(self._warmup(event.bot))
+        if len(seg.text) < self.cfg.threshold:
+            should_convert, cleaned_text = self._should_convert(seg.text)
             if should_convert:
+                text = _XML_TAG_RE.sub("", cleaned_text).strip()
+                if not text:
+                    return StepResult()
                 try:
-                    text = _XML_TAG_RE.sub("", cleaned_text).strip()
-                    if not text:
-                        return StepResult()
-                    audio = await ctx.event.bot.get_ai_record(
-                        character=self.cfg.character_id,
-                        group_id=int(self.cfg.group_id),
-                        text=text,
+                    record, cached = await self._synthesize(
+                        event.bot, text, self.cfg.timeout
+                    )
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    self.fallbacks += 1
+                    self._strip_tags(seg)
+                    return StepResult(
+                        ok=False,
+                        msg=f"TTS: 语音合成超过 {self.cfg.timeout} 秒，已改发文本",
                     )
-                    result = ctx.event.get_result()
-                    if result:
-                        result.chain = [Record.fromURL(audio)]
-                    else:
-                        logger.warning("TTS: get_result() returned None, cannot set voice message")
-                    return StepResult(msg=f"已将文本消息{text[:10]}转化为语音消息")
                 except Exception as e:
-                    return StepResult(ok=False, msg=str(e))
+                    self.fallbacks += 1
+                    self._strip_tags(seg)
+                    return StepResult(ok=False, msg=f"TTS: 语音合成失败，已改发文本: {e}")
+                result = event.get_result()
+                if result:
+                    result.chain = [record]
+                else:
+                    logger.warning("TTS: get_result() returned None, cannot set voice message")
+                return StepResult(
+                    msg=lambda: f"已将文本消息{text[:10]}转化为语音消息"
+                    + ("(缓存)" if cached else "")
+                )
+
+        self._strip_tags(seg)
+        return StepResult()
 
+    @staticmethod
+    def _strip_tags(seg: Plain) -> None:
         # 即使不转语音，也要清除 <voice/> 及其他杂散 XML 标签，但保留 <sticker .../> 供发表情
-        if (
-            isinstance(ctx.event, AiocqhttpMessageEvent)
-            and len(ctx.chain) == 1
-            and isinstance(ctx.chain[0], Plain)
-        ):  
-            cleaned = _NON_STICKER_TAG_RE.sub("", ctx.chain[0].text).strip()
-            if cleaned != ctx.chain[0].text:
-                ctx.chain[0].text = cleaned
-
-        return StepResult()
\ No newline at end of file
+        cleaned = _NON_STICKER_TAG_RE.sub("", seg.text).strip()
+        if cleaned != seg.text:
+            seg.text = cleaned
\ No newline at end of file
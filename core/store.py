@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+
+class StateStore:
+    """
+    群状态持久化（SQLite，每群一行 JSON）
+
+    - 读：按群号单行主键查询，供 StateManager 首次访问某群时在线程中懒加载；
+      使用独立的只读连接，不与写连接争锁，WAL 模式下不会等待正在进行的快照写入
+    - 写：批量 upsert，由定时快照与 terminate 在线程中调用，写连接由 _lock 串行化
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS group_state ("
+            "gid TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        # 读连接在 worker 线程中使用，由 _read_lock 串行化（不与写连接争锁）
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+    def load(self, gid: str) -> dict[str, Any] | None:
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT data FROM group_state WHERE gid = ?", (gid,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_many(self, rows: list[tuple[str, dict[str, Any], float]]) -> None:
+        """rows: (群号, 状态, 更新时间)"""
+        if not rows:
+            return
+        payload = [
+            (gid, json.dumps(data, ensure_ascii=False, separators=(",", ":")), ts)
+            for gid, data, ts in rows
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO group_state (gid, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(gid) DO UPDATE SET "
+                "data = excluded.data, updated_at = excluded.updated_at",
+                payload,
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._read_lock:
+            self._reader.close()
+        with self._lock:
+            self._conn.close()
@@ -1,3 +1,5 @@
+import asyncio
+
 from astrbot.api.event import filter
 from astrbot.api.star import Context, Star
 from astrbot.core import AstrBotConfig
@@ -28,16 +30,30 @@ class OutputPlugin(Star):
         sender_id = event.get_sender_id()
         self_id = event.get_self_id()
 
-        g = StateManager.get_group(gid)
+        g = await StateManager.load_group(gid)
 
         if self.cfg.reply.threshold > 0 and sender_id != self_id:
-            g.msg_queue.append(event.message_obj.message_id)
+            g.msg_queue.push(event.message_obj.message_id, self.cfg.reply._window)
 
         if self.cfg.pipeline.is_enabled_step(StepName.AT) and not self.cfg.at.at_str:
-            name = event.get_sender_name()
-            if len(g.name_to_qq) >= 100:
-                g.name_to_qq.popitem(last=False)
-            g.name_to_qq[name] = sender_id
+            g.remember_name(event.get_sender_name(), sender_id)
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("outstats")
+    async def outstats(self, event: AstrMessageEvent):
+        """查看输出管道各步骤的执行统计"""
+        yield event.plain_result(self.pipeline.report())
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("outreload")
+    async def outreload(self, event: AstrMessageEvent):
+        """重新读取配置文件，仅重建配置有变化的步骤"""
+        try:
+            data = await asyncio.to_thread(self.cfg.read_saved)
+        except Exception as e:
+            yield event.plain_result(f"读取配置失败：{e}")
+            return
+        yield event.plain_result(await self.pipeline.reload(data))
 
     @filter.on_llm_request()
     async def on_llm_req(self, event: AstrMessageEvent, req: ProviderRequest):
@@ -75,7 +91,7 @@ class OutputPlugin(Star):
             gid=event.get_group_id(),
             uid=event.get_sender_id(),
             bid=event.get_self_id(),
-            group=StateManager.get_group(event.get_group_id()),
+            group=await StateManager.load_group(event.get_group_id()),
             timestamp=event.message_obj.timestamp,
         )
 
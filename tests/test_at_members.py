@@ -0,0 +1,127 @@
+"""
+AtStep 成员目录：用替身 OneBot 客户端验证按成员列表解析假 @、
+大群收录上限、拉取失败后的退避，以及括号备注别名
+"""
+
+import asyncio
+
+from bench.corpus import fake_members
+from bench.fakes import BenchConfig, FakeBot, make_ctx
+from core.model import OutContext
+from core.step import AtStep
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _with_step(overrides, body):
+    step = AtStep(BenchConfig({"at": {"member_ttl": 3600, **overrides}}))
+    try:
+        return await body(step)
+    finally:
+        await step.terminate()
+
+
+async def _refresh(step: AtStep, ctx: OutContext) -> None:
+    step._refresh_members(ctx)
+    await asyncio.gather(*step._loading.values())
+
+
+def _name(member: dict) -> str:
+    return member["card"] or member["nickname"]
+
+
+def test_directory_hit_resolves_silent_member():
+    members = fake_members(50)
+    target = max(members, key=lambda m: m["last_sent_time"])
+    bot = FakeBot(members=members)
+
+    async def body(step):
+        ctx = make_ctx(f"[at:{_name(target)}]你好", gid="700001", bot=bot)
+        await _refresh(step, ctx)
+        assert ctx.group.members is not None
+        assert ctx.group.members.total == 50
+        _, qq, _, _ = step._parse_fake_at(ctx)
+        assert qq == str(target["user_id"])
+
+        # member_ttl 内不重复拉取，过期后在后台刷新
+        for _ in range(3):
+            await _refresh(step, make_ctx("你好", gid="700001", bot=bot))
+        assert bot.calls["get_group_member_list"] == 1
+        ctx.group.members.loaded_at -= 3600
+        await _refresh(step, make_ctx("你好", gid="700001", bot=bot))
+        assert bot.calls["get_group_member_list"] == 2
+
+    _run(_with_step({}, body))
+
+
+def test_large_group_keeps_recent_speakers_only():
+    members = fake_members(200)
+    by_recent = sorted(members, key=lambda m: m["last_sent_time"])
+    recent, stale = by_recent[-1], by_recent[0]
+    bot = FakeBot(members=members)
+
+    async def body(step):
+        ctx = make_ctx(f"[at:{_name(recent)}]你好", gid="700002", bot=bot)
+        await _refresh(step, ctx)
+        directory = ctx.group.members
+        assert directory is not None
+        assert directory.total == 200
+        assert directory.get(_name(recent)) == str(recent["user_id"])
+        assert directory.get(_name(stale)) is None
+        _, qq, _, _ = step._parse_fake_at(ctx)
+        assert qq == str(recent["user_id"])
+
+    _run(_with_step({"member_limit": 20}, body))
+
+
+def test_load_failure_falls_back_and_backs_off():
+    bot = FakeBot(member_error=RuntimeError("retcode=1200"))
+
+    async def body(step):
+        ctx = make_ctx("@张三 你好", gid="700003", bot=bot)
+        ctx.group.remember_name("张三", "30000")
+        await _refresh(step, ctx)
+        assert ctx.group.members is not None
+        assert len(ctx.group.members) == 0
+        _, qq, _, _ = step._parse_fake_at(ctx)
+        assert qq == "30000"
+
+        # 等下一个 member_ttl 再重试
+        await _refresh(step, make_ctx("你好", gid="700003", bot=bot))
+        assert bot.calls["get_group_member_list"] == 1
+
+    _run(_with_step({}, body))
+
+
+def test_bracket_alias_hit():
+    members = [
+        {
+            "user_id": 50001,
+            "nickname": "lisi",
+            "card": "李四(小李)",
+            "last_sent_time": 1,
+        },
+        {"user_id": 50002, "nickname": "Al", "card": "", "last_sent_time": 2},
+    ]
+    bot = FakeBot(members=members)
+
+    async def body(step):
+        ctx = make_ctx("@李四 明天见", gid="700004", bot=bot)
+        await _refresh(step, ctx)
+        idx, qq, nickname, end = step._parse_fake_at(ctx)
+        assert (qq, nickname) == ("50001", "李四(小李)")
+        assert ctx.chain[idx].text[end:] == "明天见"
+
+        _, qq, _, _ = step._parse_fake_at(
+            make_ctx("[at:李四（小李）]明天见", gid="700004", bot=bot)
+        )
+        assert qq == "50001"
+
+        # 英文昵称须在词边界处结束
+        ctx = make_ctx("@Alice 你好", gid="700004", bot=bot)
+        _, qq, _, _ = step._parse_fake_at(ctx)
+        assert qq is None
+
+    _run(_with_step({}, body))